@@ -0,0 +1,77 @@
+"""
+Size/latency trade-off of the column codecs.
+
+Run from the repository root:
+    python -m benchmarks.bench_codecs [rows]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core.codecs import LzmaCodec, ZlibCodec, ZlibDictCodec
+from core.db import SQLiteDB, logger
+
+MODEL_NAME = "spoon_product"
+CREATE_MODEL = f"CREATE TABLE {MODEL_NAME} (id integer PRIMARY KEY, url text NOT NULL, payload text)"
+INSERT_DATA = f"INSERT INTO {MODEL_NAME} VALUES (?,?,?)"
+
+URL_PREFIX = "http://www.spoon.guru/"
+WORDS = ["recipes", "bbq", "blog", "solutions", "retail", "team", "contact", "gut", "brain", "how-it-works"]
+
+CODECS = {
+    "none": None,
+    "zlib": ZlibCodec(),
+    "zlib-dict": ZlibDictCodec((URL_PREFIX + "".join(f"{word}/" for word in WORDS)).encode()),
+    "lzma": LzmaCodec(),
+}
+
+
+def get_data(rows):
+    rand = random.Random(0)
+    for pk in range(rows):
+        path = "-".join(rand.choice(WORDS) for _ in range(3))
+        payload = " ".join(rand.choice(WORDS) for _ in range(200))
+        yield pk, f"{URL_PREFIX}{path}/{pk}/", payload
+
+
+def bench(name, codec, rows):
+    path = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    db = SQLiteDB(path)
+    db.connect()
+    if codec is not None:
+        db.register_codec(MODEL_NAME, "url", codec)
+        db.register_codec(MODEL_NAME, "payload", codec)
+    db.execute(CREATE_MODEL)
+
+    start = time.perf_counter()
+    db.executemany(INSERT_DATA, get_data(rows))
+    db.commit()
+    write = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # rows are decoded when read, read every encoded column
+    for row in db.manager.all(MODEL_NAME):
+        row[1], row[2]
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    db.manager.filter(MODEL_NAME, url=f"{URL_PREFIX}blog-bbq-team/7/")
+    lookup = time.perf_counter() - start
+
+    db.close()
+    return os.path.getsize(path), write, scan, lookup
+
+
+def main(rows=5000):
+    logger.setLevel(logging.WARNING)
+    print(f"{'codec':<10} {'size (KiB)':>12} {'write (s)':>10} {'scan (s)':>10} {'lookup (s)':>11}")
+    for name, codec in CODECS.items():
+        size, write, scan, lookup = bench(name, codec, rows)
+        print(f"{name:<10} {size / 1024:>12.0f} {write:>10.3f} {scan:>10.3f} {lookup:>11.4f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""
+Write throughput of several processes writing to the same database file.
+
+Run from the repository root:
+    python -m benchmarks.bench_contention [processes] [writes per process]
+"""
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.db import SQLiteDB, logger
+
+MODEL_NAME = "spoon_product"
+CREATE_MODEL = f"CREATE TABLE IF NOT EXISTS {MODEL_NAME} (id integer PRIMARY KEY, url text NOT NULL, rating integer)"
+INSERT_DATA = f"INSERT INTO {MODEL_NAME} (url, rating) VALUES (?,?)"
+WRITER_THREADS = 4
+
+# mode => (busy_timeout, lock_retries, write queue)
+MODES = {
+    "fail-fast": (0, 0, False),
+    "busy-timeout": (5, 0, False),
+    "backoff": (0.01, 50, False),
+    "write-queue": (0.01, 50, True),
+}
+
+
+def writer(path, mode, writes, results):
+    logger.setLevel(logging.WARNING)
+    busy_timeout, lock_retries, use_queue = MODES[mode]
+    db = SQLiteDB(path, busy_timeout=busy_timeout, lock_retries=lock_retries)
+    db.connect()
+    written = errors = 0
+
+    if use_queue:
+        with ThreadPoolExecutor(WRITER_THREADS) as executor:
+            futures = list(executor.map(lambda i: db.write(INSERT_DATA, f"http://www.spoon.guru/{i}/", i), range(writes)))
+        for future in futures:
+            try:
+                written += future.result()
+            except sqlite3.OperationalError:
+                errors += 1
+        write_queue = db.get_write_queue()
+        write_queue.close()
+        lock_waits = write_queue.db.metrics["lock_waits"]
+    else:
+        for i in range(writes):
+            try:
+                db.execute(INSERT_DATA, f"http://www.spoon.guru/{i}/", i)
+                db.commit()
+                written += 1
+            except sqlite3.OperationalError:
+                errors += 1
+                db.connect().rollback()
+        lock_waits = db.metrics["lock_waits"]
+    db.close()
+    results.put((written, errors, lock_waits))
+
+
+def bench(mode, processes, writes):
+    path = os.path.join(tempfile.mkdtemp(), f"{mode}.db")
+    db = SQLiteDB(path)
+    db.connect()
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(CREATE_MODEL)
+    db.commit()
+    db.close()
+
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=writer, args=(path, mode, writes, results)) for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    totals = [sum(values) for values in zip(*(results.get() for _ in workers))]
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start, *totals)
+
+
+def main(processes=8, writes=300):
+    print(f"{processes} processes x {writes} writes")
+    print(f"{'mode':<14} {'written':>8} {'errors':>7} {'lock waits':>11} {'time (s)':>9} {'writes/s':>9}")
+    for mode in MODES:
+        elapsed, written, errors, lock_waits = bench(mode, processes, writes)
+        print(f"{mode:<14} {written:>8} {errors:>7} {lock_waits:>11} {elapsed:>9.2f} {written / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,53 @@
+"""
+Latency of a filter on the in-memory replica against the same filter on sqlite.
+
+Run from the repository root:
+    python -m benchmarks.bench_in_memory [rows] [calls]
+"""
+import logging
+import random
+import sys
+import timeit
+
+from core.db import SQLiteDB, logger
+from core.memory import InMemoryDB
+
+MODEL_NAME = "spoon_product"
+CREATE_MODEL = f"CREATE TABLE {MODEL_NAME} (id integer PRIMARY KEY, url text NOT NULL, date text, rating integer)"
+INSERT_DATA = f"INSERT INTO {MODEL_NAME} VALUES (?,?,?,?)"
+
+FILTERS = {
+    "id=5": {"id": 5},
+    "id__in=[1,2,3]": {"id__in": [1, 2, 3]},
+    "url__startswith": {"url__startswith": "http://www.spoon.guru/7"},
+    "rating__gt": {"rating__gt": 98},
+}
+
+
+def get_data(rows):
+    rand = random.Random(0)
+    for pk in range(rows):
+        yield pk, f"http://www.spoon.guru/{pk}/", f"2021-{pk % 12 + 1:02}-01", rand.randrange(100)
+
+
+def main(rows=10000, calls=20000):
+    logger.setLevel(logging.WARNING)
+    db = SQLiteDB(":memory:")
+    db.connect()
+    db.execute(CREATE_MODEL)
+    db.executemany(INSERT_DATA, get_data(rows))
+    db.commit()
+    memory_db = InMemoryDB(db, [MODEL_NAME])
+    memory_db.connect()
+
+    print(f"{'filter':<16} {'sqlite (us)':>12} {'memory (us)':>12}")
+    for name, kwargs in FILTERS.items():
+        timings = []
+        for manager in (db.manager, memory_db.manager):
+            seconds = min(timeit.repeat(lambda: manager.filter(MODEL_NAME, **kwargs), number=calls, repeat=5))
+            timings.append(seconds / calls * 1e6)
+        print(f"{name:<16} {timings[0]:>12.2f} {timings[1]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
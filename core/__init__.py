@@ -5,5 +5,6 @@ DB Wrapper
 Easily query a sql database
 """
 from .db import SQLiteDB, SQLiteManager
+from .memory import InMemoryDB, InMemoryManager
 
-__all__ = ["SQLiteDB", "SQLiteManager"]
+__all__ = ["SQLiteDB", "SQLiteManager", "InMemoryDB", "InMemoryManager"]
@@ -0,0 +1,85 @@
+from datetime import date, datetime
+from hashlib import blake2b
+from math import ceil, exp, log
+
+from .formats import get_numeric_value
+
+
+class BloomFilter:
+    """
+    Probabilistic set answering whether a value is definitely absent or maybe present.
+
+    Sized for ``capacity`` values at a false positive rate of ``fp_rate``, unless
+    ``max_bytes`` caps the bit array, in which case the false positive rate grows.
+    Values are keyed by their text form, so 5 and '5' share a key the same way
+    sqlite type affinity would match them. With ``numeric`` (a column with INTEGER, REAL
+    or NUMERIC affinity) values are keyed by the number sqlite stores, so '07' and 7.0 are 7.
+    Booleans and dates are keyed as the sqlite3 module binds them, 1 and 'YYYY-MM-DD'.
+    """
+
+    # values keyed the way sqlite stores them
+    TYPES = (bool, int, float, str, bytes, date)
+
+    def __init__(self, capacity, fp_rate=0.01, max_bytes=None, numeric=False):
+        bits = ceil(-max(capacity, 1) * log(fp_rate) / log(2) ** 2)
+        if max_bytes is not None:
+            bits = min(bits, max_bytes * 8)
+        self.size = max(bits, 8)
+        self.hashes = max(1, round(self.size / max(capacity, 1) * log(2)))
+        self.bits = bytearray(ceil(self.size / 8))
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.max_bytes = max_bytes
+        self.numeric = numeric
+        self.count = 0
+
+        # stats
+        self.checks = 0
+        self.pruned = 0
+
+    def add(self, value):
+        for position in self.get_positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        self.checks += 1
+        for position in self.get_positions(value):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                self.pruned += 1
+                return False
+        return True
+
+    def get_positions(self, value):
+        """ Bit positions of a value using double hashing over a single digest. """
+        digest = blake2b(self.get_key(value).encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def get_key(self, value):
+        if isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat(" ")
+        elif isinstance(value, date):
+            value = value.isoformat()
+        if self.numeric:
+            value = get_numeric_value(value)
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+        return str(value)
+
+    def get_fp_rate(self):
+        """ Estimated false positive rate for the values added so far. """
+        return (1 - exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def get_stats(self):
+        return {
+            "checks": self.checks,
+            "pruned": self.pruned,
+            "passed": self.checks - self.pruned,
+            "count": self.count,
+            "bytes": len(self.bits),
+            "hashes": self.hashes,
+            "fp_rate": self.get_fp_rate(),
+        }
@@ -0,0 +1,126 @@
+import lzma
+import zlib
+from abc import ABCMeta, abstractmethod
+from collections.abc import Sequence
+
+from .formats import FieldTypeNotSupportedError
+
+
+class BaseCodec(metaclass=ABCMeta):
+    """
+    Abstract column codec.
+
+    Values are encoded when inserted through ``SQLiteDB.execute/executemany`` and decoded
+    the first time a row coming out of the manager is read. Values that are not bytes (NULL or rows
+    written as plain values, such as numbers) are passed through untouched on decode.
+
+    Encoding must give the same bytes for the same value, since equality filters compare
+    the encoded bytes. Compressor output may change across zlib/lzma builds.
+    """
+
+    def get_encoded(self, value):
+        """
+        Encoded text value. NULL and numbers are stored as they are,
+        bytes can not be told apart from encoded values on decode.
+        """
+        if isinstance(value, str):
+            return self.encode(value.encode())
+        elif isinstance(value, bytes):
+            raise FieldTypeNotSupportedError("A column with a codec stores text values, not bytes.")
+        return value
+
+    def get_decoded(self, value):
+        if not isinstance(value, bytes):
+            return value
+        return self.decode(value).decode()
+
+    @abstractmethod
+    def encode(self, data: bytes) -> bytes:
+        """ Compress the utf-8 bytes of a text value. """
+
+    @abstractmethod
+    def decode(self, data: bytes) -> bytes:
+        """ Decompress back to the utf-8 bytes of a text value. """
+
+
+class ZlibCodec(BaseCodec):
+    """ zlib compression, a good default for long text payloads. """
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def encode(self, data):
+        return zlib.compress(data, self.level)
+
+    def decode(self, data):
+        return zlib.decompress(data)
+
+
+class ZlibDictCodec(BaseCodec):
+    """
+    Raw deflate with a preset dictionary, for short and repetitive values such as urls.
+    e.g:
+    ZlibDictCodec(b"http://www.spoon.guru/")
+    """
+
+    def __init__(self, zdict: bytes, level=9):
+        self.zdict = zdict
+        self.level = level
+
+    def encode(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.zdict)
+        return compressor.compress(data) + compressor.flush()
+
+    def decode(self, data):
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.zdict)
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+class LzmaCodec(BaseCodec):
+    """ lzma compression, smallest output for large payloads at a higher cpu cost. """
+
+    def __init__(self, preset=6):
+        self.preset = preset
+
+    def encode(self, data):
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=self.get_filters())
+
+    def decode(self, data):
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=self.get_filters())
+
+    def get_filters(self):
+        return [{"id": lzma.FILTER_LZMA2, "preset": self.preset}]
+
+
+class DecodedRows(Sequence):
+    """
+    Rows decoding their encoded fields the first time each row is read,
+    so the rows never looked at are never decompressed.
+    """
+
+    def __init__(self, rows, positions):
+        self.rows = list(rows)
+        self.positions = positions
+        self.decoded = [False] * len(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.rows)))]
+        if not self.decoded[index]:
+            row = list(self.rows[index])
+            for i, codec in self.positions:
+                row[i] = codec.get_decoded(row[i])
+            self.rows[index] = tuple(row)
+            self.decoded[index] = True
+        return self.rows[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
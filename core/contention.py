@@ -0,0 +1,179 @@
+import atexit
+import os
+import random
+import threading
+from concurrent.futures import Future
+from queue import Empty, Queue
+
+# marks the end of the writer thread
+CLOSE = object()
+
+
+def is_locked_error(error):
+    """ When sqlite gave up waiting for a lock held by another connection. """
+    return str(error).startswith(("database is locked", "database table is locked"))
+
+
+class Backoff:
+    """
+    Jittered exponential backoff adapting to the recent contention.
+
+    Every lock wait doubles the delay bound used by the next ones, so it grows
+    exponentially while a command keeps failing and stays high while the
+    database is contended. Every command getting through after waiting
+    halves it back towards ``minimum``. Delays are drawn uniformly up to the bound so competing
+    writers spread out.
+    """
+
+    def __init__(self, minimum=0.005, maximum=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.base = minimum
+
+    def get_delay(self):
+        delay = random.uniform(0, self.base)
+        self.base = min(self.maximum, self.base * 2)
+        return delay
+
+    def success(self):
+        self.base = max(self.minimum, self.base / 2)
+
+
+class WriteQueue:
+    """
+    Single writer thread per process and database file.
+
+    Writes submitted from any thread are run in order on the writer connection,
+    several at a time inside one transaction, so the process only ever takes the
+    database write lock from one connection and holds it for fewer commits.
+    The queues still running when the interpreter exits are closed, committing
+    the writes they hold.
+    """
+
+    BATCH_SIZE = 100
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, database, factory):
+        """
+        Writer queue of the current process for a database, started on first use.
+
+        :param factory: callable creating the writer SQLiteDB
+        """
+        key = (os.getpid(), database)
+        with cls._lock:
+            if not cls._instances:
+                atexit.register(cls.close_all)
+            write_queue = cls._instances.get(key)
+            if write_queue is None or not write_queue.thread.is_alive():
+                write_queue = cls._instances[key] = cls(factory)
+        return write_queue
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.queue = Queue()
+        self.db = None
+        self.metrics = {"writes": 0, "batches": 0, "errors": 0}
+        self.thread = threading.Thread(target=self.run, name="sqlite-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, sql, data):
+        """
+        Queue a command to run for every row of data.
+
+        :return: future of the number of rows written
+        :rtype: Future
+        """
+        future = Future()
+        self.queue.put((sql, data, future))
+        return future
+
+    def flush(self):
+        """ Wait until every write queued so far is committed. """
+        future = Future()
+        self.queue.put((None, None, future))
+        future.result()
+
+    def close(self):
+        """ Commit the queued writes and stop the writer thread. """
+        future = Future()
+        self.queue.put((CLOSE, None, future))
+        future.result()
+        self.thread.join()
+
+    @classmethod
+    def close_all(cls):
+        """ Commit the queued writes and stop every writer thread of the current process. """
+        with cls._lock:
+            write_queues = [
+                write_queue for (pid, _), write_queue in cls._instances.items()
+                if pid == os.getpid() and write_queue.thread.is_alive()
+            ]
+        for write_queue in write_queues:
+            write_queue.close()
+
+    def get_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < self.BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def run(self):
+        self.db = self.factory()
+        self.db.connect()
+        running = True
+        while running:
+            batch = self.get_batch()
+            writes = [(sql, data, future) for sql, data, future in batch if sql is not None and sql is not CLOSE]
+            try:
+                done = self.write_batch(writes)
+            except Exception as error:
+                # nothing of the batch is kept when it can not be committed
+                self.db.connect().rollback()
+                self.metrics["errors"] += 1
+                for _, _, future in writes:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                for future, rowcount in done:
+                    self.metrics["writes"] += 1
+                    future.set_result(rowcount)
+
+            for sql, _, future in batch:
+                if sql is CLOSE:
+                    running = False
+                if sql is None or sql is CLOSE:
+                    future.set_result(None)
+        self.db.close()
+
+    def write_batch(self, writes):
+        """
+        Run the writes in a single transaction, each one inside a savepoint,
+        so a failing write is rolled back alone and the others are committed.
+
+        :return: futures of the committed writes and their number of rows written
+        :rtype: list
+        """
+        if not writes:
+            return []
+        done = []
+        self.db.execute("BEGIN IMMEDIATE")
+        for sql, data, future in writes:
+            self.db.execute("SAVEPOINT write")
+            try:
+                rowcount = self.db.executemany(sql, data).rowcount
+            except Exception as error:
+                self.db.execute("ROLLBACK TO write")
+                self.metrics["errors"] += 1
+                future.set_exception(error)
+            else:
+                done.append((future, rowcount))
+            self.db.execute("RELEASE write")
+        self.db.commit()
+        self.metrics["batches"] += 1
+        return done
@@ -1,9 +1,18 @@
 import logging
+import random
+import re
 import sqlite3
 import sys
+import time
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from math import sqrt
+from pathlib import Path
 
-from .formats import Format
+from .bloom import BloomFilter
+from .codecs import DecodedRows
+from .contention import Backoff, WriteQueue, is_locked_error
+from .formats import TRANSFORMS, FilterLookupError, Format, get_transform_expression
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +24,74 @@ logger.addHandler(handler)
 logger.setLevel(logging.DEBUG)
 
 
+####################
+###  EXCEPTIONS  ###
+####################
+class QueryInterruptedError(sqlite3.OperationalError):
+    """ When a running query is interrupted before it finishes. """
+
+
+class QueryTimeoutError(QueryInterruptedError):
+    """ When a running query is interrupted because it went over its time budget. """
+
+
+def get_deadline(timeout=None, deadline=None):
+    """
+    Earliest of an absolute deadline and a timeout in seconds from now.
+
+    :return: time.monotonic() value or None when there is no budget
+    :rtype: float
+    """
+    if timeout is not None:
+        timeout_deadline = time.monotonic() + timeout
+        deadline = timeout_deadline if deadline is None else min(deadline, timeout_deadline)
+    return deadline
+
+
+# inserts of a single VALUES tuple, the only ones whose bound parameters can be mapped to columns
+INSERT_PATTERN = re.compile(
+    r"^\s*(?:INSERT|REPLACE)(?:\s+OR\s+\w+)?\s+INTO\s+(?:[\"`\[]?\w+[\"`\]]?\.)?[\"`\[]?(\w+)[\"`\]]?\s*"
+    r"(?:\(([^)]*)\))?\s*VALUES\s*\(([^()]*)\)\s*;?\s*$",
+    re.IGNORECASE,
+)
+NAMED_PARAMETER = re.compile(r"^[:@$]\w+$")
+LEADING_COMMENTS = re.compile(r"^(?:\s+|--[^\n]*(?:\n|$)|/\*.*?(?:\*/|$))+", re.DOTALL)
+# statements that do not change rows, a WITH clause only reads when no write follows it
+READ_PATTERN = re.compile(r"^(?:SELECT|VALUES|EXPLAIN|PRAGMA)\b", re.IGNORECASE)
+WRITE_KEYWORDS = re.compile(r"\b(?:INSERT|REPLACE|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+def strip_comments(sql):
+    """ Statement without the whitespace and comments leading it. """
+    return LEADING_COMMENTS.sub("", sql, count=1)
+
+
+def is_read(sql):
+    """ Whether a statement, stripped of its leading comments, leaves the rows untouched. """
+    if READ_PATTERN.match(sql):
+        return True
+    return sql[:4].upper() == "WITH" and not WRITE_KEYWORDS.search(sql)
+
+
+def get_affinity(declared_type):
+    """ Affinity sqlite gives a column of this declared type. """
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return "INTEGER"
+    elif any(name in declared_type for name in ("CHAR", "CLOB", "TEXT")):
+        return "TEXT"
+    elif "BLOB" in declared_type or not declared_type:
+        return "BLOB"
+    elif any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+        return "REAL"
+    return "NUMERIC"
+
+
+def has_numeric_affinity(declared_type):
+    """ Whether sqlite gives a column of this declared type INTEGER, REAL or NUMERIC affinity. """
+    return get_affinity(declared_type) in ("INTEGER", "REAL", "NUMERIC")
+
+
 class BaseDB(metaclass=ABCMeta):
     """ Abstract Database Class. """
 
@@ -38,46 +115,556 @@ class BaseDB(metaclass=ABCMeta):
 class SQLiteManager:
     """ SQLite Database Manager. """
 
+    MAX_COMPOUND_SELECT = 500
+    SAMPLE_BLOCKS = 16
+    COUNT_BLOCKS = 64
+
     def __init__(self, db):
         self.db = db
+        self.timeouts = {}
+        self.blooms = {}
+        self.stale_blooms = set()
+        self.generated_fields = {}
 
-    def all(self, model):
+    def all(self, model, timeout=None, deadline=None, sample=None, seed=0):
         """
         Get all entries from a model(table).
 
+        :param sample: see ``filter``
         :return: all entries
         :rtype: list
         """
-        return self.db.execute(f"SELECT * FROM {model}").fetchall()
+        self.validate_sample(sample)
+        query = f"SELECT {self.get_select_fields(model)} FROM {model}"
+        if isinstance(sample, float):
+            query = f"{query} WHERE {self.get_sample_condition(model, sample, seed)}"
+            sample = None
+        rows = self.fetchall(model, query, timeout, deadline, sample, seed)
+        return self.db.decode_rows(model, rows)
 
-    def filter(self, model, **kwargs):
+    def filter(self, model, conditions=None, /, timeout=None, deadline=None, sample=None, seed=0, **kwargs):
         """
         Filter all entries from a model(table).
 
+        Filter conditions are given as keyword arguments, or as a ``conditions`` dict
+        for fields named like the query options (timeout, deadline, sample, seed).
+        e.g:
+        db.manager.filter("event", {"timeout": 5}, timeout=0.1)
+
+        :param sample: a float fraction (0, 1] only scans that share of the model through
+            random rowid ranges, so the cost does not depend on the model size.
+            An int returns that many filtered entries picked uniformly by reservoir sampling.
+            Both are repeatable for the same ``seed``.
         :return: filtered entries
         :rtype: list
         """
-        conditions = []
+        kwargs = self.get_filters(conditions, kwargs)
+        if not kwargs:
+            raise FilterLookupError(
+                "No filter conditions: timeout, deadline, sample and seed are query options, "
+                "filter fields with these names through the conditions dict."
+            )
+        self.validate_sample(sample)
+        kwargs = self.prune_filters(model, kwargs)
+        if kwargs is None:
+            return []
+        sql_conditions, params = self.get_conditions(model, **kwargs)
+        if isinstance(sample, float):
+            sql_conditions = f"{sql_conditions} AND {self.get_sample_condition(model, sample, seed)}"
+            sample = None
+
+        ## final query
+        query = f"SELECT {self.get_select_fields(model)} FROM {model} WHERE {sql_conditions}"
+        logger.debug(f"\nSQL => {query} {params}")
+        rows = self.fetchall(model, query, timeout, deadline, sample, seed, params)
+        return self.db.decode_rows(model, rows)
+
+    def approx_count(
+            self, model, conditions=None, /, sample_size=1000, seed=0, z=1.96, timeout=None, deadline=None, **kwargs
+    ):
+        """
+        Estimate how many entries match the filters by only scanning about ``sample_size``
+        rowids in random ranges, so the cost does not depend on the model size.
+        Conditions are given as in ``filter``, no condition counts every entry.
+
+        Every range is a cluster sampled from its own stratum of the rowid span, the error
+        bound comes from how much the matches scaled up from each range vary, so it holds
+        when matching entries are clustered together.
+
+        :param z: normal quantile of the error bound, 1.96 for 95% confidence
+        :return: estimated count and its error bound (estimate ± error)
+        :rtype: tuple
+        """
+        if isinstance(sample_size, bool) or not isinstance(sample_size, int) or sample_size < 1:
+            raise ValueError("sample_size is a positive int number of rowids.")
+        kwargs = self.prune_filters(model, self.get_filters(conditions, kwargs))
+        if kwargs is None:
+            return 0, 0
+        sql_conditions, params = self.get_conditions(model, **kwargs) if kwargs else ("1", [])
+        low, high, windows = self.get_rowid_windows(model, sample_size, seed, blocks=self.COUNT_BLOCKS)
+        if not windows:
+            return 0, 0
+
+        cases = " ".join(f"WHEN rowid BETWEEN {start} AND {end} THEN {i}" for i, (start, end) in enumerate(windows))
+        query = (
+            f"SELECT CASE {cases} END, TOTAL(CASE WHEN {sql_conditions} THEN 1 ELSE 0 END) "
+            f"FROM {model} WHERE {self.get_windows_condition(windows)} GROUP BY 1"
+        )
+        logger.debug(f"\nSQL => {query} {params}")
+        matched = dict(self.fetchall(model, query, timeout, deadline, params=params))
+
+        span = high - low + 1
+        covered = sum(end - start + 1 for start, end in windows)
+        if covered >= span:
+            return int(sum(matched.values())), 0
+
+        # matches of every range scaled up to its stratum, their spread gives the variance
+        blocks = self.get_rowid_blocks(low, span, len(windows))
+        totals = [
+            (block_end - block_start) / (end - start + 1) * matched.get(i, 0)
+            for i, ((start, end), (block_start, block_end)) in enumerate(zip(windows, blocks))
+        ]
+        estimate = sum(totals)
+        if len(totals) < 2:
+            return estimate, float(span)
+        mean = estimate / len(totals)
+        variance = sum((total - mean) ** 2 for total in totals) / (len(totals) - 1)
+        error = z * sqrt(len(totals) * variance * (1 - covered / span))
+        return estimate, error
+
+    def filter_many(self, specs, timeout=None, deadline=None):
+        """
+        Run many independent filters in as few round trips as possible.
+
+        Each spec is a ``(model, {field__lookup: value})`` tuple with at least one condition. All the specs
+        targeting the same model are sent as a single ``UNION ALL`` statement
+        tagged with the spec position, and the rows are split back per spec.
+        e.g:
+        db.manager.filter_many([("product", {"id": 1}), ("product", {"rating__gt": 50})])
+
+        :return: filtered entries for every spec, in the same order as the specs
+        :rtype: list
+        """
+        deadline = get_deadline(timeout, deadline)
+        results = [[] for _ in specs]
+        by_model = {}
+        for position, (model, kwargs) in enumerate(specs):
+            if not kwargs:
+                raise FilterLookupError(f"No filter conditions in spec {position}: use all() for every entry.")
+            kwargs = self.prune_filters(model, kwargs)
+            if kwargs is None:
+                continue
+            by_model.setdefault(model, []).append((position, *self.get_conditions(model, **kwargs)))
+
+        for model, selects in by_model.items():
+            # sqlite refuses compound selects above SQLITE_MAX_COMPOUND_SELECT terms
+            for start in range(0, len(selects), self.MAX_COMPOUND_SELECT):
+                chunk = selects[start:start + self.MAX_COMPOUND_SELECT]
+                query = " UNION ALL ".join(
+                    f"SELECT {position}, {self.get_select_fields(model)} FROM {model} WHERE {sql_conditions}"
+                    for position, sql_conditions, _ in chunk
+                )
+                params = [param for _, _, select_params in chunk for param in select_params]
+                logger.debug(f"\nSQL => {query} {params}")
+                for row in self.fetchall(model, query, deadline=deadline, params=params):
+                    results[row[0]].append(row[1:])
+        return [self.db.decode_rows(model, rows) for (model, _), rows in zip(specs, results)]
+
+    def enable_bloom(self, model, field, fp_rate=0.01, max_bytes=None, capacity=None):
+        """
+        Keep a Bloom filter of the values of a column, so equality and ``in`` filters
+        on keys that are definitely absent are answered without querying the database.
+
+        The filter is built right away from the column values and kept up to date
+        with the inserts made through ``SQLiteDB.execute/executemany``. Any other statement
+        naming the model through them, other than a read, rebuilds it on the next filter.
+        Writes made by triggers, ``executescript`` or other connections are not tracked.
+
+        :param capacity: expected number of values, twice the current rows by default
+        :param max_bytes: memory budget of the filter, at the cost of a higher fp_rate
+        """
+        values = [row[0] for row in self.db.execute(f"SELECT {field} FROM {model}").fetchall()]
+        codec = self.db.codecs.get(model, {}).get(field)
+        if codec is not None:
+            values = [codec.get_decoded(value) for value in values]
+
+        declared_type = next(
+            (column[2] for column in self.db.execute(f"PRAGMA table_info({model})") if column[1] == field), ""
+        )
+        numeric = codec is None and has_numeric_affinity(declared_type)
+        bloom = BloomFilter(capacity or max(2 * len(values), 1024), fp_rate, max_bytes, numeric)
+        for value in values:
+            if value is not None:
+                bloom.add(value)
+        self.blooms.setdefault(model, {})[field] = bloom
+        self.stale_blooms.discard((model, field))
+        return bloom
+
+    def get_bloom_stats(self, model):
+        """
+        Checks, pruned keys, memory and estimated false positive rate per column Bloom filter.
+
+        :rtype: dict
+        """
+        return {field: bloom.get_stats() for field, bloom in self.blooms.get(model, {}).items()}
+
+    def prune_filters(self, model, kwargs):
+        """
+        Drop the values of equality and ``in`` filters that a Bloom filter knows are absent.
+
+        :return: the pruned filters, or None when no entry can match them
+        :rtype: dict
+        """
+        blooms = self.blooms.get(model)
+        if not blooms:
+            return kwargs
         for raw_field, raw_value in kwargs.items():
+            field, _, lookup = raw_field.partition("__")
+            if field not in blooms or lookup not in ("", "in"):
+                continue
+            bloom = self.get_bloom(model, field)
+            field_class = Format(raw_field, raw_value).get_format_class()
+            if lookup == "":
+                if field_class.get_db_value(raw_value) not in bloom:
+                    return None
+            else:
+                values = [value for value in raw_value if field_class.get_db_value(value) in bloom]
+                if not values:
+                    return None
+                kwargs = {**kwargs, raw_field: values}
+        return kwargs
+
+    def get_bloom(self, model, field):
+        stale_bloom = self.blooms[model][field]
+        if (model, field) not in self.stale_blooms:
+            return stale_bloom
+        bloom = self.enable_bloom(model, field, stale_bloom.fp_rate, stale_bloom.max_bytes, stale_bloom.capacity)
+        bloom.checks, bloom.pruned = stale_bloom.checks, stale_bloom.pruned
+        return bloom
+
+    def track_writes(self, sql, rows):
+        """
+        Add the inserted values to the Bloom filters of the model written to.
+        Only inserts of a single VALUES tuple made of bound parameters are followed,
+        any other statement naming a model with filters, other than a read, marks them as stale.
+
+        :return: the rows, to be passed on to sqlite
+        """
+        sql = strip_comments(sql)
+        if is_read(sql):
+            return rows
+        models = [model for model in self.blooms if re.search(rf"(?<!\w){re.escape(model)}(?!\w)", sql, re.IGNORECASE)]
+        if not models:
+            return rows
+
+        match = INSERT_PATTERN.match(sql)
+        model = match and next((model for model in models if model.lower() == match.group(1).lower()), None)
+        for stale_model in models:
+            if stale_model != model:
+                self.stale_blooms.update((stale_model, field) for field in self.blooms[stale_model])
+        if not model:
+            return rows
+
+        blooms = self.blooms[model]
+        params = self.db.get_insert_params(match)
+        params = {field: params[field] for field in blooms if field in params} if params else {}
+        for field in blooms.keys() - params.keys():
+            self.stale_blooms.add((model, field))
+        if not params:
+            return rows
+        return (self.track_row(model, row, blooms, params) for row in rows)
+
+    def track_row(self, model, row, blooms, params):
+        for field, param in params.items():
+            value = row[param]
+            if not isinstance(value, BloomFilter.TYPES):
+                # sqlite may fill a NULL in (e.g. rowid aliases), or adapt values of other types
+                self.stale_blooms.add((model, field))
+            else:
+                blooms[field].add(value)
+        return row
+
+    def create_transform_index(self, model, raw_field, generated=False):
+        """
+        Index a transformed field so filters on it become index seeks.
+        e.g:
+        db.manager.create_transform_index("spoon_product", "date__year")
+
+        By default an expression index on the same sql the transform compiles to is created.
+        With ``generated``, a virtual generated column (e.g. date_year) is added and indexed
+        instead, and filters on the transform are rewritten to it. The column is left out of
+        the entries returned by ``all/filter``, and found again from the schema by other connections.
+
+        :raises ValueError: when the model already has a column of that name which is not the generated one
+        """
+        field, *transforms = raw_field.split("__")
+        if not transforms:
+            raise FilterLookupError(f"Missing transform: try {', '.join(TRANSFORMS)}")
+        expression = get_transform_expression(field, transforms)
+        name = "_".join([field, *transforms])
+
+        if generated:
+            columns = [column[1].lower() for column in self.db.execute(f"PRAGMA table_xinfo({model})")]
+            if name.lower() not in columns:
+                column_type = "INTEGER" if TRANSFORMS[transforms[-1]][1] is int else "TEXT"
+                self.db.execute(
+                    f"ALTER TABLE {model} ADD COLUMN {name} {column_type} GENERATED ALWAYS AS ({expression}) VIRTUAL"
+                )
+            elif self.get_generated_fields(model).get(raw_field) != name:
+                raise ValueError(f"{model} already has a column {name} not generated from {raw_field}.")
+            self.get_generated_fields(model)[raw_field] = name
+            expression = name
+
+        query = f"CREATE INDEX IF NOT EXISTS {model}_{name}_idx ON {model} ({expression})"
+        logger.debug(f"\nSQL => {query}")
+        self.db.execute(query)
+
+    def get_generated_fields(self, model):
+        """
+        Transformed fields of a model(table) backed by a generated column, read from
+        the schema the first time they are needed.
+        e.g:
+        date_year GENERATED ALWAYS AS (CAST(strftime('%Y', date) AS INTEGER))   =>  {date__year: date_year}
+
+        :rtype: dict
+        """
+        if model in self.generated_fields:
+            return self.generated_fields[model]
+        table_sql = self.db.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", model).fetchone()
+        if table_sql is None:
+            return {}
+
+        generated_fields = {}
+        fields = self.db.get_fields(model)
+        for column in self.db.execute(f"PRAGMA table_xinfo({model})"):
+            # hidden 2 and 3 are virtual and stored generated columns
+            if column[6] not in (2, 3):
+                continue
+            for field in fields:
+                transforms = column[1][len(field) + 1:].split("_")
+                if not column[1].startswith(f"{field}_") or not all(name in TRANSFORMS for name in transforms):
+                    continue
+                if f"AS ({get_transform_expression(field, transforms)})" in table_sql[0]:
+                    generated_fields["__".join([field, *transforms])] = column[1]
+        self.generated_fields[model] = generated_fields
+        return generated_fields
+
+    def get_select_fields(self, model):
+        """ Columns of the entries of a model(table), leaving its generated columns out. """
+        if not self.get_generated_fields(model):
+            return "*"
+        return ", ".join(self.db.get_fields(model))
+
+    def get_generated_field(self, generated_fields, raw_field):
+        """
+        e.g:
+        date__year__gte   =>  date_year__gte   when date__year is a generated column
+        """
+        for transformed_field, column in generated_fields.items():
+            if raw_field == transformed_field or raw_field.startswith(f"{transformed_field}__"):
+                return column + raw_field[len(transformed_field):]
+        return raw_field
+
+    def get_filters(self, conditions, kwargs):
+        """ Filter conditions given as a dict merged with the ones given as keyword arguments. """
+        if not conditions:
+            return kwargs
+        return {**conditions, **kwargs}
+
+    def set_timeout(self, model, timeout):
+        """ Default time budget in seconds for the queries on a model(table). None removes it. """
+        if timeout is None:
+            self.timeouts.pop(model, None)
+        else:
+            self.timeouts[model] = timeout
+
+    def fetchall(self, model, query, timeout=None, deadline=None, reservoir=None, seed=0, params=()):
+        """
+        Run the query with its bound parameters and fetch its rows within the time budget,
+        falling back to the model default budget when none is given.
+        With a ``reservoir`` size, only that many rows picked uniformly are kept.
+
+        :raises QueryTimeoutError: when the budget is spent before all rows are fetched
+        """
+        if timeout is None and deadline is None:
+            timeout = self.timeouts.get(model)
+        with self.db.budget(timeout, deadline):
+            cursor = self.db.execute(query, *params)
+            if reservoir is None:
+                return cursor.fetchall()
+            return self.get_reservoir(cursor, reservoir, seed)
+
+    def get_reservoir(self, rows, size, seed=0):
+        """ Uniform sample of ``size`` rows in a single pass (algorithm R). """
+        rand = random.Random(seed)
+        reservoir = []
+        for i, row in enumerate(rows):
+            if i < size:
+                reservoir.append(row)
+            else:
+                position = rand.randrange(i + 1)
+                if position < size:
+                    reservoir[position] = row
+        return reservoir
+
+    def get_rowid_windows(self, model, rowids=None, seed=0, fraction=None, blocks=None):
+        """
+        Split the rowid span of a model(table) in ``blocks`` strata (``SAMPLE_BLOCKS`` by default)
+        and pick a random range in each of them, covering about ``rowids`` rowids (or a ``fraction``
+        of the span) in total.
+
+        :return: lowest rowid, highest rowid and the (start, end) ranges
+        :rtype: tuple
+        """
+        low, high = self.db.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {model}").fetchone()
+        if low is None:
+            if self.db.execute(f"SELECT 1 FROM {model} LIMIT 1").fetchone():
+                raise ValueError(f"{model} has no rowid to sample, e.g. it is a view.")
+            return low, high, []
+        span = high - low + 1
+        if fraction is not None:
+            rowids = max(1, round(span * fraction))
+        if rowids >= span:
+            return low, high, [(low, high)]
+
+        rand = random.Random(seed)
+        blocks = max(1, min(blocks or self.SAMPLE_BLOCKS, rowids))
+        width = max(1, rowids // blocks)
+        windows = []
+        for block_start, block_end in self.get_rowid_blocks(low, span, blocks):
+            start = block_start + rand.randrange(max(1, block_end - block_start - width + 1))
+            windows.append((start, min(start + width, block_end) - 1))
+        return low, high, windows
+
+    def get_rowid_blocks(self, low, span, blocks):
+        """ (start, end) of the strata of a rowid span, the end being excluded. """
+        return [(low + span * block // blocks, low + span * (block + 1) // blocks) for block in range(blocks)]
+
+    def validate_sample(self, sample):
+        if sample is None:
+            return
+        if isinstance(sample, float) and 0 < sample <= 1 or type(sample) is int and sample >= 0:
+            return
+        raise ValueError("sample is a float fraction in (0, 1] or an int number of entries >= 0.")
+
+    def get_sample_condition(self, model, fraction, seed=0):
+        _, _, windows = self.get_rowid_windows(model, seed=seed, fraction=fraction)
+        return self.get_windows_condition(windows) if windows else "0"
+
+    def get_windows_condition(self, windows):
+        return "(" + " OR ".join(f"rowid BETWEEN {start} AND {end}" for start, end in windows) + ")"
+
+    def get_conditions(self, model, **kwargs):
+        """
+        Build the sql conditions from the filter lookups.
+
+        :return: conditions joined by AND, and the parameters bound to them
+        :rtype: tuple
+        """
+        codecs = self.db.codecs.get(model)
+        generated_fields = self.get_generated_fields(model)
+        conditions, params = [], []
+        for raw_field, raw_value in kwargs.items():
+            if codecs and raw_field.partition("__")[0] in codecs:
+                conditions.append(self.get_encoded_condition(codecs, raw_field, raw_value))
+                continue
+            if generated_fields:
+                raw_field = self.get_generated_field(generated_fields, raw_field)
             formatter = Format(raw_field, raw_value)
             field_class = formatter.get_format_class()
             conditions.append(field_class.get_string())
+            params.extend(field_class.params)
+        return " AND ".join(conditions), params
 
-        ## final query
-        sql_conditions = " AND ".join(conditions)
-        query = f"SELECT * FROM {model} WHERE {sql_conditions}"
-        logger.debug(f"\nSQL => {query}")
-        return self.db.execute(query).fetchall()
+    def get_encoded_condition(self, codecs, raw_field, raw_value):
+        """
+        Condition on a column with a codec, matching both the encoded bytes and the plain
+        value of rows that were not encoded on write.
+        Only equality lookups are meaningful on encoded values.
+        e.g:
+        url='x'   =>  (url=X'...' OR url='x')
+        """
+        field, _, lookup = raw_field.partition("__")
+        codec = codecs[field]
+        if lookup not in ("", "in", "not_in"):
+            raise FilterLookupError("This lookup is not supported on an encoded field: try in, not_in")
+        if isinstance(raw_value, list):
+            encoded_value = [codec.get_encoded(value) for value in raw_value]
+        else:
+            encoded_value = codec.get_encoded(raw_value)
+
+        encoded_condition = Format(raw_field, encoded_value).get_format_class().get_string()
+        raw_condition = Format(raw_field, raw_value).get_format_class().get_string()
+        operator = " AND " if lookup == "not_in" else " OR "
+        return f"({encoded_condition}{operator}{raw_condition})"
+
+
+class Cursor:
+    """
+    sqlite3 cursor raising QueryTimeoutError or QueryInterruptedError, instead of
+    a bare OperationalError, when fetching its rows is interrupted.
+    """
+
+    def __init__(self, db, cursor):
+        self.db = db
+        self.cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.fetch(self.cursor.__next__)
+
+    def fetchone(self):
+        return self.fetch(self.cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self.fetch(self.cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self.fetch(self.cursor.fetchall)
+
+    def fetch(self, method, *args):
+        try:
+            return method(*args)
+        except sqlite3.OperationalError as error:
+            raise self.db.get_interrupt_error(error)
 
 
 class SQLiteDB(BaseDB):
     """ SQLite Database. """
 
-    def __init__(self, *args, **kwargs):
+    # sqlite virtual machine instructions between two deadline checks
+    PROGRESS_STEPS = 1000
+    # retries once sqlite's busy timeout gave up waiting for a lock, opt-in
+    LOCK_RETRIES = 0
+
+    def __init__(self, *args, busy_timeout=None, lock_retries=LOCK_RETRIES, **kwargs):
+        """
+        Takes the arguments of ``sqlite3.connect``.
+
+        :param busy_timeout: seconds sqlite waits for a lock held by another connection
+            before failing, same as the ``timeout`` argument of ``sqlite3.connect``
+        :param lock_retries: times a command failing on a lock is retried with a jittered
+            adaptive backoff, 0 (the default) fails right away. Rows given to ``executemany``
+            as an iterator are read into a list when retries are enabled.
+        """
+        if busy_timeout is not None:
+            kwargs["timeout"] = busy_timeout
         self.args = args
         self.kwargs = kwargs
         self._connection = None
+        self._deadline = None
+        self._budgeted = False
+        self._fields = {}
         self.connected = False
+        self.codecs = {}
+        self.lock_retries = lock_retries
+        self.backoff = Backoff()
+        self.metrics = {"lock_waits": 0, "lock_wait_time": 0.0, "lock_errors": 0}
 
         # managers
         self.manager = SQLiteManager(self)
@@ -95,15 +682,295 @@ class SQLiteDB(BaseDB):
         """ End the connection to the SQLite database. """
         if self.connected:
             self._connection.close()
+        self._deadline = None
         self.connected = False
 
-    def execute(self, sql, *args):
-        """ Execute a command to the SQLite database. """
-        return self._connection.execute(sql, args)
+    def execute(self, sql, *args, timeout=None, deadline=None):
+        """
+        Execute a command to the SQLite database.
+
+        With a ``timeout`` in seconds or an absolute ``deadline`` (a time.monotonic() value)
+        the command, and fetching from the returned cursor, is interrupted once the budget
+        is spent. The budget stays armed until the next command.
+
+        :raises QueryTimeoutError: when the budget is spent, running the command or fetching its rows
+        :rtype: Cursor
+        """
+        deadline = get_deadline(timeout, deadline)
+        if deadline is not None:
+            self.set_deadline(deadline)
+        elif not self._budgeted and self._deadline is not None:
+            self.set_deadline(None)
+        if self.manager.blooms:
+            args = next(iter(self.manager.track_writes(sql, [args])))
+        if self.codecs:
+            args = next(iter(self.encode_rows(sql, [args])))
+        try:
+            return Cursor(self, self._connection.execute(sql, args))
+        except sqlite3.OperationalError as error:
+            if is_locked_error(error):
+                return Cursor(self, self.retry_locked(error, self._connection.execute, sql, args))
+            raise self.get_interrupt_error(error)
+
+    def retry_locked(self, error, command, *args):
+        """
+        Retry a command that failed on a lock held by another connection, sleeping
+        a jittered adaptive backoff between attempts, up to ``lock_retries`` times.
+
+        A transaction that already read before writing can not get the lock while
+        another connection waits to commit, in that case retrying the statement does
+        not help: write through ``write/write_many`` or start with ``BEGIN IMMEDIATE``.
+        """
+        for _ in range(self.lock_retries):
+            delay = self.backoff.get_delay()
+            self.metrics["lock_waits"] += 1
+            self.metrics["lock_wait_time"] += delay
+            time.sleep(delay)
+            try:
+                result = command(*args)
+            except sqlite3.OperationalError as retry_error:
+                if not is_locked_error(retry_error):
+                    raise self.get_interrupt_error(retry_error)
+                error = retry_error
+            else:
+                self.backoff.success()
+                return result
+        self.metrics["lock_errors"] += 1
+        raise error
+
+    @contextmanager
+    def budget(self, timeout=None, deadline=None):
+        """
+        Interrupt every command run, and every row fetched, inside the block once
+        the time budget is spent.
+
+        :raises QueryTimeoutError: when the budget is spent
+        """
+        deadline = get_deadline(timeout, deadline)
+        if deadline is None:
+            yield
+            return
+        self.set_deadline(deadline)
+        self._budgeted = True
+        try:
+            yield
+        except sqlite3.OperationalError as error:
+            raise self.get_interrupt_error(error)
+        finally:
+            self._budgeted = False
+            self.set_deadline(None)
+
+    def interrupt(self):
+        """ Cancel the command currently running on the connection. Safe to call from another thread. """
+        self._connection.interrupt()
+
+    def set_deadline(self, deadline):
+        """ Arm sqlite's progress handler to abort the running command after the deadline. """
+        self._deadline = deadline
+        if deadline is None:
+            self._connection.set_progress_handler(None, 0)
+        else:
+            self._connection.set_progress_handler(self.is_past_deadline, self.PROGRESS_STEPS)
+
+    def is_past_deadline(self):
+        return time.monotonic() >= self._deadline
+
+    def get_interrupt_error(self, error):
+        if isinstance(error, QueryInterruptedError) or str(error) != "interrupted":
+            return error
+        if self._deadline is not None and self.is_past_deadline():
+            return QueryTimeoutError("query went over its time budget")
+        return QueryInterruptedError("query was interrupted")
 
     def commit(self):
         """ Write changes to the SQLite database. """
-        self._connection.commit()
+        try:
+            self._connection.commit()
+        except sqlite3.OperationalError as error:
+            if not is_locked_error(error):
+                raise
+            self.retry_locked(error, self._connection.commit)
+
+    def backup(self, target, pages_per_step=100, sleep=0.25, progress=None):
+        """
+        Copy the database into target with sqlite's online backup API.
+
+        The copy runs ``pages_per_step`` pages at a time, sleeping ``sleep`` seconds
+        between steps so concurrent readers only wait on one step at a time.
+        ``progress(status, remaining, total)`` is called after each step.
+
+        The codecs registered on this database are registered on the target as well.
+
+        :param target: database path or SQLiteDB
+        :return: the connected target database
+        :rtype: SQLiteDB
+        """
+        target_db = target if isinstance(target, SQLiteDB) else SQLiteDB(target)
+        target_db.connect()
+        self.share_codecs(target_db)
+
+        def step(status, remaining, total):
+            logger.debug(f"\nBackup => {total - remaining}/{total} pages")
+            if progress is not None:
+                progress(status, remaining, total)
+            if remaining and sleep:
+                time.sleep(sleep)
+
+        self._connection.backup(target_db._connection, pages=pages_per_step, progress=step, sleep=sleep)
+        return target_db
+
+    def snapshot(self, target=":memory:", **kwargs):
+        """
+        Read-only copy of the database, isolated from later changes, to run heavy queries against.
+        Takes the same keyword arguments as ``backup``.
+
+        :param target: ":memory:" or a database path
+        :rtype: SQLiteDB
+        """
+        snapshot_db = self.backup(target, **kwargs)
+        if target == ":memory:":
+            snapshot_db.execute("PRAGMA query_only = ON")
+            return snapshot_db
+
+        snapshot_db.close()
+        snapshot_db = SQLiteDB(f"{Path(target).absolute().as_uri()}?mode=ro", uri=True)
+        snapshot_db.connect()
+        self.share_codecs(snapshot_db)
+        return snapshot_db
+
+    def share_codecs(self, target_db):
+        """ Register the codecs of this database on a copy of it, keeping the ones it already has. """
+        for model, codecs in self.codecs.items():
+            target_db.codecs[model] = {**codecs, **target_db.codecs.get(model, {})}
 
     def executemany(self, sql, data):
-        return self._connection.executemany(sql, data)
+        """ Execute a command for every row of data, encoding the columns registered with a codec. """
+        if self.manager.blooms:
+            data = self.manager.track_writes(sql, data)
+        if self.codecs:
+            data = self.encode_rows(sql, data)
+        if self.lock_retries and not isinstance(data, (list, tuple)):
+            # rows are read again when retried
+            data = list(data)
+        try:
+            return self._connection.executemany(sql, data)
+        except sqlite3.OperationalError as error:
+            if not is_locked_error(error):
+                raise
+            return self.retry_locked(error, self._connection.executemany, sql, data)
+
+    def write(self, sql, *args):
+        """
+        Queue a write on the single writer thread of the process for this database.
+        The write is only durable once its future resolves; writes still queued when
+        the interpreter exits are committed by an exit hook, not on a crash or os._exit().
+
+        :return: future of the number of rows written
+        :rtype: concurrent.futures.Future
+        """
+        return self.write_many(sql, [args])
+
+    def write_many(self, sql, data):
+        """
+        Queue a command for every row of data on the single writer thread of the process.
+        Durable once its future resolves, see ``write``.
+
+        :return: future of the number of rows written
+        :rtype: concurrent.futures.Future
+        """
+        if self.manager.blooms:
+            data = self.manager.track_writes(sql, data)
+        if self.codecs:
+            data = self.encode_rows(sql, data)
+        return self.get_write_queue().submit(sql, list(data))
+
+    def get_write_queue(self):
+        """
+        Single writer thread of the process for this database, shared by every SQLiteDB on
+        the same file.
+
+        :raises ValueError: for a private in-memory database, the writer connection would open another one
+        :rtype: WriteQueue
+        """
+        database = str(self.kwargs.get("database", self.args[0] if self.args else ""))
+        in_memory = database in ("", ":memory:") or "mode=memory" in database or database.startswith("file::memory:")
+        if in_memory and "cache=shared" not in database:
+            raise ValueError(
+                f"The write queue can not write to the in-memory database {database!r} of this connection: "
+                f"use a database file or a shared cache uri such as file::memory:?cache=shared"
+            )
+        return WriteQueue.get(database, lambda: SQLiteDB(*self.args, lock_retries=self.lock_retries, **self.kwargs))
+
+    def register_codec(self, model, field, codec):
+        """
+        Compress a text column of a model(table) with a codec from ``core.codecs``.
+        e.g:
+        db.register_codec("spoon_product", "url", ZlibDictCodec(b"http://www.spoon.guru/"))
+
+        Values are encoded on inserts of a single VALUES tuple made only of bound parameters,
+        e.g. INSERT INTO model (a, b) VALUES (?, ?); any other write stores plain values,
+        which are still read and filtered upon. Equality filters compare the compressed
+        bytes, so rows written by another zlib/lzma build (e.g. zlib-ng) may not match them.
+        """
+        self.codecs.setdefault(model, {})[field] = codec
+
+    def get_fields(self, model):
+        """ Column names of a model(table) in table order. """
+        if model not in self._fields:
+            self._fields[model] = [column[1] for column in self.execute(f"PRAGMA table_info({model})")]
+        return self._fields[model]
+
+    def get_insert_params(self, match):
+        """
+        Bound parameter of every column written by an insert matched by INSERT_PATTERN.
+        e.g:
+        INSERT INTO model (id, url) VALUES (?, ?)   =>  {id: 0, url: 1}
+        INSERT INTO model (id, url) VALUES (:id, :link)   =>  {id: id, url: link}
+
+        :return: parameter position or name per field, None when a value is not a bound parameter
+        :rtype: dict
+        """
+        model, fields, values = match.groups()
+        if fields:
+            fields = [field.strip().strip('"`[]') for field in fields.split(",")]
+        else:
+            fields = self.get_fields(model)
+        values = [value.strip() for value in values.split(",")]
+        if len(values) != len(fields):
+            return None
+        if all(value == "?" for value in values):
+            return {field: position for position, field in enumerate(fields)}
+        if all(NAMED_PARAMETER.match(value) for value in values):
+            return {field: value[1:] for field, value in zip(fields, values)}
+        return None
+
+    def encode_rows(self, sql, rows):
+        match = INSERT_PATTERN.match(strip_comments(sql))
+        codecs = match and self.codecs.get(match.group(1))
+        if not codecs:
+            return rows
+        params = self.get_insert_params(match)
+        if params is None:
+            return rows
+
+        params = [(params[field], codec) for field, codec in codecs.items() if field in params]
+        return (self.encode_row(row, params) for row in rows)
+
+    def encode_row(self, row, params):
+        row = dict(row) if isinstance(row, dict) else list(row)
+        for param, codec in params:
+            row[param] = codec.get_encoded(row[param])
+        return row
+
+    def decode_rows(self, model, rows):
+        """
+        Rows of a model(table) with codecs decode their fields the first time they are read.
+
+        :rtype: DecodedRows
+        """
+        codecs = self.codecs.get(model)
+        if not codecs:
+            return rows
+
+        positions = [(i, codecs[field]) for i, field in enumerate(self.get_fields(model)) if field in codecs]
+        return DecodedRows(rows, positions)
@@ -1,3 +1,4 @@
+import re
 from abc import ABCMeta, abstractmethod
 from datetime import date
 from typing import List, Union
@@ -14,12 +15,94 @@ class FieldTypeNotSupportedError(Exception):
     """ When a developer filters the database with an unsupported field type."""
 
 
+####################
+###  TRANSFORMS  ###
+####################
+# text sqlite reads as a number when a numeric affinity applies to it
+NUMBER_PATTERN = re.compile(r"^\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*$")
+
+
+def get_sqlite_text(value) -> str:
+    """ Text sqlite converts a value to, e.g. 1e20 is 1.0e+20. """
+    if isinstance(value, bytes):
+        return value.decode(errors="replace")
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        # sqlite does not keep the sign of zero
+        value += 0.0
+        if value in (float("inf"), float("-inf")):
+            return "Inf" if value > 0 else "-Inf"
+        mantissa, e, exponent = f"{value:.15g}".partition("e")
+        if "." not in mantissa:
+            mantissa += ".0"
+        return mantissa + e + exponent
+    return str(value)
+
+
+def get_numeric_value(value):
+    """ Number sqlite reads from a numeric looking text, e.g. '07' is 7, any other value is kept. """
+    if isinstance(value, str) and NUMBER_PATTERN.match(value):
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+    return value
+
+
+# transform => (sql expression, type of the transformed value)
+TRANSFORMS = {
+    "year": ("CAST(strftime('%Y', {field}) AS INTEGER)", int),
+    "month": ("CAST(strftime('%m', {field}) AS INTEGER)", int),
+    "day": ("CAST(strftime('%d', {field}) AS INTEGER)", int),
+    # monday is 0 and sunday is 6, as datetime.date.weekday()
+    "weekday": ("(CAST(strftime('%w', {field}) AS INTEGER) + 6) % 7", int),
+    "length": ("length({field})", int),
+    "lower": ("lower({field})", str),
+}
+
+
+def get_transform_expression(field: str, transforms: List[str]) -> str:
+    """
+    Sql expression of a field with its transforms applied in order.
+    e.g:
+    date, [year]   =>  CAST(strftime('%Y', date) AS INTEGER)
+    url, [lower, length]   =>  length(lower(url))
+    """
+    validate_transforms(transforms)
+    for transform in transforms:
+        field = TRANSFORMS[transform][0].format(field=field)
+    return field
+
+
+def validate_transforms(transforms: List[str]):
+    for transform in transforms:
+        if transform not in TRANSFORMS:
+            raise FilterLookupError(f"This transform is not supported: try {', '.join(TRANSFORMS)}")
+
+
+def get_prefix_successor(prefix: str) -> Union[str, None]:
+    """
+    Smallest string greater than every string starting with prefix, None when there is none.
+    e.g:
+    http://www.spoon.guru/blog/   =>  http://www.spoon.guru/blog0
+    """
+    prefix = prefix.rstrip(chr(0x10FFFF))
+    if not prefix:
+        return None
+    code_point = ord(prefix[-1]) + 1
+    if 0xD800 <= code_point <= 0xDFFF:
+        # surrogates can not be encoded, skip to the next valid code point
+        code_point = 0xE000
+    return prefix[:-1] + chr(code_point)
+
+
 ######################
 ###  BASE CLASSES  ###
 ######################
 class BaseSingleFieldFormat:
     def get_format_condition(self, lookup_operator):
-        return f"{self.field}{lookup_operator}{self.get_format_value()}"
+        return f"{self.get_sql_field()}{lookup_operator}{self.get_format_value()}"
 
     def get_format_value(self) -> str:
         """
@@ -34,7 +117,7 @@ class BaseSingleFieldFormat:
 
 class BaseListFieldFormat:
     def get_format_list_condition(self, lookup_operator):
-        return f"{self.field} {lookup_operator} ({self.get_format_list_value()})"
+        return f"{self.get_sql_field()} {lookup_operator} ({self.get_format_list_value()})"
 
     def get_format_list_value(self) -> str:
         """
@@ -51,7 +134,29 @@ class BaseListFieldFormat:
         return ','.join(list(map(self.format_value, self.value)))
 
 
-class BaseFieldFormat(BaseSingleFieldFormat, BaseListFieldFormat, metaclass=ABCMeta):
+class BaseRangeFieldFormat:
+    def get_format_range_condition(self, lookup_operator):
+        low, high = self.value
+        return self.get_format_bound_condition(low, high)
+
+    def get_format_prefix_condition(self, lookup_operator):
+        return self.get_format_bound_condition(self.value, get_prefix_successor(self.value))
+
+    def get_format_bound_condition(self, low, high) -> str:
+        """
+        Half-open range with bound parameters, which sqlite serves with an index range scan.
+        e.g:
+        field >= ? AND field < ?   with params [low, high]
+        """
+        field = self.get_sql_field()
+        self.params.append(self.get_db_value(low))
+        if high is None:
+            return f"{field}>=?"
+        self.params.append(self.get_db_value(high))
+        return f"{field}>=? AND {field}<?"
+
+
+class BaseFieldFormat(BaseSingleFieldFormat, BaseListFieldFormat, BaseRangeFieldFormat, metaclass=ABCMeta):
     TYPE = None
     ALLOW_LOOKUPS = (
         "gt",
@@ -71,6 +176,8 @@ class BaseFieldFormat(BaseSingleFieldFormat, BaseListFieldFormat, metaclass=ABCM
         "lte": ("<=", "get_format_condition"),
         "in": ("IN", "get_format_list_condition"),
         "not_in": ("NOT IN", "get_format_list_condition"),
+        "startswith": (None, "get_format_prefix_condition"),
+        "range": (None, "get_format_range_condition"),
     }
 
     def __init__(self, raw_field: str, raw_value: Union[str, int, date, List]):
@@ -79,34 +186,78 @@ class BaseFieldFormat(BaseSingleFieldFormat, BaseListFieldFormat, metaclass=ABCM
         self.field = None
         self.value = None
         self.lookup = None
+        self.transforms = []
+        self.params = []
 
     ### Main
     def get_string(self) -> str:
+        sql_lookup, str_func = self.get_lookup()
+        sql_str = getattr(self, str_func)(sql_lookup)
+        return sql_str
+
+    def get_lookup(self):
+        """
+        Split the raw field into field and lookup, validate the lookup and
+        return the sql operator along with the method formatting the condition.
+        """
         self.field, self.value = self.raw_field, self.raw_value
+        self.params = []
         if self.is_lookup_query(self.field):
             self.field, self.lookup = self.split_field_and_lookup(self.field)
+            self.validate_transforms()
             self.validate_lookup()
-            sql_lookup, str_func = self.LOOKUPS[self.lookup]
-        else:
-            # instead of None. Better way?
-            sql_lookup, str_func = self.LOOKUPS[None]
+            self.validate_lookup_value(self.value)
+        # instead of None. Better way?
+        return self.LOOKUPS[self.lookup]
 
-        sql_str = getattr(self, str_func)(sql_lookup)
-        return sql_str
+    def get_sql_field(self) -> str:
+        return get_transform_expression(self.field, self.transforms)
 
     # utils
+    def validate_transforms(self):
+        validate_transforms(self.transforms)
+        if self.transforms and TRANSFORMS[self.transforms[-1]][1] is not self.TYPE:
+            raise FilterLookupError(
+                f"The {self.transforms[-1]} transform is compared to {TRANSFORMS[self.transforms[-1]][1].__name__} values."
+            )
+
     def validate_lookup(self):
+        if self.lookup is None:
+            return
         if self.lookup not in self.ALLOW_LOOKUPS:
             supported_lookups = ", ".join(lup for lup in self.LOOKUPS.keys() if lup is not None)
             raise FilterLookupError(f"This lookup is not supported: try {supported_lookups}")
 
+    def validate_lookup_value(self, value):
+        if self.lookup == "startswith" and not isinstance(value, str):
+            raise FilterLookupError("The startswith lookup takes a single str value.")
+        if self.lookup == "range" and (not isinstance(value, (list, tuple)) or len(value) != 2):
+            raise FilterLookupError("The range lookup takes a (low, high) pair of values.")
+
     def is_lookup_query(self, field: str):
         return True if "__" in field else False
 
     def split_field_and_lookup(self, raw_field):
-        field, lookup = raw_field.split("__")
+        """
+        e.g:
+        rating__gt   =>  rating, gt
+        date__year   =>  date, None with the transforms [year]
+        date__year__gte   =>  date, gte with the transforms [year]
+        """
+        field, *self.transforms, lookup = raw_field.split("__")
+        if lookup in TRANSFORMS:
+            self.transforms.append(lookup)
+            lookup = None
         return field, lookup
 
+    def get_db_value(self, value: TYPE):
+        """
+        Override this method when the value is stored in the database differently than the python value.
+        e.g:
+        field = datetime.date(2021,2,2)   =>  if field(column) in database is a date type: return strftime('%Y-%m-%d')
+        """
+        return value
+
     @abstractmethod
     def format_value(self, value: TYPE) -> str:
         """
@@ -123,13 +274,14 @@ class BaseFieldFormat(BaseSingleFieldFormat, BaseListFieldFormat, metaclass=ABCM
 #######################
 class StringFieldFormat(BaseFieldFormat):
     TYPE = str
-    ALLOW_LOOKUPS = ("in", "not_in")
+    ALLOW_LOOKUPS = ("in", "not_in", "startswith", "range")
 
     def format_value(self, value: str) -> str:
         """
         This will return sql condition formatted for a string value:
         - for a single value => field='value' or for all operators in class attr ALLOW_LOOKUPS
         - for a value list => field IN ('value1', 'value2', )
+        - for a prefix or a (low, high) range => field>=? AND field<? with bound parameters
         """
         return f"'{value}'"
 
@@ -143,7 +295,10 @@ class DateFieldFormat(BaseFieldFormat):
         - for a single value => field='%Y-%m-%d' or field>='%Y-%m-%d' or for all operators in class attr ALLOW_LOOKUPS
         - for a value list => field (NOT) IN ('%Y-%m-%d', '%Y-%m-%d', )
         """
-        return f"'{value.strftime('%Y-%m-%d')}'"
+        return f"'{self.get_db_value(value)}'"
+
+    def get_db_value(self, value: date) -> str:
+        return value.strftime('%Y-%m-%d')
 
 
 class IntegerFieldFormat(BaseFieldFormat):
@@ -158,6 +313,19 @@ class IntegerFieldFormat(BaseFieldFormat):
         return f"{value}"
 
 
+class BytesFieldFormat(BaseFieldFormat):
+    TYPE = bytes
+    ALLOW_LOOKUPS = ("in", "not_in")
+
+    def format_value(self, value: bytes) -> str:
+        """
+        This will return sql condition formatted for a blob value:
+        - for a single value => field=X'hex'
+        - for a value list => field (NOT) IN (X'hex1', X'hex2', )
+        """
+        return f"X'{value.hex()}'"
+
+
 ###################
 ###  INTERFACE  ###
 ###################
@@ -166,6 +334,7 @@ class Format:
         DateFieldFormat,
         StringFieldFormat,
         IntegerFieldFormat,
+        BytesFieldFormat,
     )
 
     def __init__(self, raw_field, raw_value):
@@ -180,9 +349,11 @@ class Format:
             return StringFieldFormat(self.raw_field, self.raw_value)
         elif isinstance(self.raw_value, date):
             return DateFieldFormat(self.raw_field, self.raw_value)
+        elif isinstance(self.raw_value, bytes):
+            return BytesFieldFormat(self.raw_field, self.raw_value)
 
-        ### When they come in a list for lookups such: [IN, NOT IN]
-        elif isinstance(self.raw_value, list):
+        ### When they come in a list for lookups such: [IN, NOT IN, RANGE]
+        elif isinstance(self.raw_value, (list, tuple)):
             if not self.are_homogeneous_type(self.raw_value):
                 raise ValueError("All values must be same type.")
             return self.get_class_from_type()(self.raw_field, self.raw_value)
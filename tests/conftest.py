@@ -1,6 +1,7 @@
 import pytest
 
 from core.db import SQLiteDB
+from core.memory import InMemoryDB
 
 MODEL_NAME = "spoon_product"
 MODEL_FIELDS = ["id", "url", "date", "rating"]
@@ -30,6 +31,12 @@ DATA = [
 ]
 
 
+def get_query_plan(db, **kwargs):
+    sql_conditions, params = db.manager.get_conditions(MODEL_NAME, **kwargs)
+    plan = db.execute(f"EXPLAIN QUERY PLAN SELECT * FROM {MODEL_NAME} WHERE {sql_conditions}", *params).fetchall()
+    return " ".join(row[-1] for row in plan)
+
+
 @pytest.fixture
 def empty_db():
     db = SQLiteDB(":memory:")
@@ -55,3 +62,11 @@ def filter(empty_db):
     db.commit()
     yield db.manager.filter
     db.close()
+
+
+@pytest.fixture
+def memory_db(db):
+    memory_db = InMemoryDB(db, [MODEL_NAME])
+    memory_db.connect()
+    yield memory_db
+    memory_db.close()
@@ -0,0 +1,83 @@
+import pytest
+
+from core.codecs import LzmaCodec, ZlibCodec, ZlibDictCodec
+from core.formats import FieldTypeNotSupportedError, FilterLookupError
+from tests.conftest import CREATE_MODEL, DATA, INSERT_DATA, MODEL_NAME, SELECT_ALL
+
+CODECS = [ZlibCodec(), ZlibDictCodec(b"http://www.spoon.guru/"), LzmaCodec()]
+
+
+@pytest.fixture(params=CODECS)
+def codec_db(request, empty_db):
+    db = empty_db
+    db.register_codec(MODEL_NAME, "url", request.param)
+    db.execute(CREATE_MODEL)
+    db.executemany(INSERT_DATA, DATA)
+    db.commit()
+    yield db
+
+
+class CodecTests:
+    def test_stores_encoded_values(self, codec_db):
+        stored_urls = [row[1] for row in codec_db.execute(SELECT_ALL).fetchall()]
+        assert all(isinstance(url, bytes) for url in stored_urls)
+
+    def test_can_retrieve_all_decoded_objects(self, codec_db):
+        assert codec_db.manager.all(MODEL_NAME) == DATA
+
+    def test_can_filter_encoded_field_equality(self, codec_db):
+        results = codec_db.manager.filter(MODEL_NAME, url="http://www.spoon.guru/bbq-recipes/")
+        assert results == [DATA[8], DATA[9]]
+
+    def test_can_filter_encoded_field_with_in_and_not_in_conditions(self, codec_db):
+        urls = ["http://www.spoon.guru/bbq-recipes/", "http://www.spoon.guru/contact-2/"]
+        assert len(codec_db.manager.filter(MODEL_NAME, url__in=urls)) == 3
+        assert len(codec_db.manager.filter(MODEL_NAME, url__not_in=urls)) == 7
+
+    def test_can_filter_many_decoded(self, codec_db):
+        assert codec_db.manager.filter_many([(MODEL_NAME, {"id": 1})]) == [[DATA[0]]]
+
+    def test_can_not_filter_encoded_field_by_range(self, codec_db):
+        with pytest.raises(FilterLookupError):
+            codec_db.manager.filter(MODEL_NAME, url__gte="http://www.spoon.guru/")
+
+    def test_can_insert_with_column_list(self, codec_db):
+        codec_db.executemany(f"INSERT INTO {MODEL_NAME} (url, id) VALUES (?, ?)", [("http://www.spoon.guru/new/", 11)])
+        assert codec_db.manager.filter(MODEL_NAME, id=11) == [(11, "http://www.spoon.guru/new/", None, None)]
+
+    def test_can_insert_with_named_parameters(self, codec_db):
+        codec_db.executemany(f"INSERT INTO {MODEL_NAME} (id, url) VALUES (:id, :url)", [{"id": 11, "url": "http://www.spoon.guru/new/"}])
+        assert isinstance(codec_db.execute(f"SELECT url FROM {MODEL_NAME} WHERE id=11").fetchone()[0], bytes)
+        assert codec_db.manager.filter(MODEL_NAME, url="http://www.spoon.guru/new/") == [(11, "http://www.spoon.guru/new/", None, None)]
+
+    def test_does_not_encode_values_of_literal_columns(self, codec_db):
+        codec_db.execute(f"INSERT INTO {MODEL_NAME} VALUES (11, ?, ?, ?)", "http://www.spoon.guru/new/", "2020-01-01", 7)
+        assert codec_db.execute(f"SELECT url, date FROM {MODEL_NAME} WHERE id=11").fetchone() == ("http://www.spoon.guru/new/", "2020-01-01")
+        assert codec_db.manager.filter(MODEL_NAME, id=11) == [(11, "http://www.spoon.guru/new/", "2020-01-01", 7)]
+
+    def test_can_filter_plain_values_next_to_encoded_ones(self, codec_db):
+        url = "http://www.spoon.guru/bbq-recipes/"
+        codec_db.execute(f"INSERT INTO {MODEL_NAME} VALUES (11, '{url}', NULL, NULL)")
+        assert [row[0] for row in codec_db.manager.filter(MODEL_NAME, url=url)] == [9, 10, 11]
+        assert len(codec_db.manager.filter(MODEL_NAME, url__in=[url])) == 3
+        assert len(codec_db.manager.filter(MODEL_NAME, url__not_in=[url])) == 8
+
+    def test_decodes_rows_when_read(self, codec_db, monkeypatch):
+        decoded = []
+        codec = codec_db.codecs[MODEL_NAME]["url"]
+        get_decoded = codec.get_decoded
+        monkeypatch.setattr(codec, "get_decoded", lambda value: decoded.append(value) or get_decoded(value))
+        rows = codec_db.manager.all(MODEL_NAME)
+        assert decoded == []
+        assert rows[3] == DATA[3]
+        assert rows[3] == DATA[3]
+        assert len(decoded) == 1
+
+    def test_stores_non_text_values_as_they_are(self, codec_db):
+        codec_db.executemany(INSERT_DATA, [(11, 5, None, None)])
+        assert codec_db.manager.filter(MODEL_NAME, url=5) == [(11, "5", None, None)]
+        with pytest.raises(FieldTypeNotSupportedError):
+            codec_db.executemany(INSERT_DATA, [(12, b"raw", None, None)])
+
+    def test_snapshot_decodes_with_the_same_codecs(self, codec_db):
+        assert codec_db.snapshot().manager.all(MODEL_NAME) == DATA
@@ -0,0 +1,117 @@
+import sqlite3
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.contention import Backoff
+from core.db import SQLiteDB
+from tests.conftest import CREATE_MODEL, COUNT_ROWS, DATA, INSERT_DATA
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    db = SQLiteDB(str(tmp_path / "contention.db"), busy_timeout=0)
+    db.connect()
+    db.execute(CREATE_MODEL)
+    db.commit()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def locker(file_db):
+    """ Another connection holding the write lock until released. """
+    connection = sqlite3.connect(file_db.args[0], isolation_level=None, check_same_thread=False)
+    connection.execute("BEGIN IMMEDIATE")
+    yield connection
+    connection.close()
+
+
+class BackoffTests:
+    def test_delays_are_bounded_and_adapt_to_contention(self):
+        backoff = Backoff(minimum=0.01, maximum=0.1)
+        assert all(0 <= backoff.get_delay() <= 0.1 for _ in range(10))
+        assert backoff.base == 0.1
+        for _ in range(10):
+            backoff.success()
+        assert backoff.base == 0.01
+
+
+class WriterContentionTests:
+    def test_fails_right_away_without_retries(self, file_db, locker):
+        with pytest.raises(sqlite3.OperationalError):
+            file_db.executemany(INSERT_DATA, DATA)
+        assert file_db.metrics["lock_waits"] == 0
+
+    def test_retries_until_the_lock_is_released(self, file_db, locker):
+        file_db.lock_retries = 20
+        file_db.backoff = Backoff(minimum=0.02, maximum=0.2)
+        threading.Timer(0.05, locker.rollback).start()
+        file_db.executemany(INSERT_DATA, DATA)
+        file_db.commit()
+        assert file_db.execute(COUNT_ROWS).fetchone() == (10,)
+        assert file_db.metrics["lock_waits"] > 0
+        assert file_db.metrics["lock_errors"] == 0
+
+    def test_gives_up_after_the_retries(self, file_db, locker):
+        file_db.lock_retries = 2
+        file_db.backoff = Backoff(minimum=0.001, maximum=0.002)
+        with pytest.raises(sqlite3.OperationalError):
+            file_db.execute(INSERT_DATA, *DATA[0])
+        assert file_db.metrics["lock_waits"] == 2
+        assert file_db.metrics["lock_errors"] == 1
+
+    def test_write_queue_serializes_writes_from_many_threads(self, file_db):
+        with ThreadPoolExecutor(4) as executor:
+            futures = list(executor.map(lambda row: file_db.write(INSERT_DATA, *row), DATA))
+        assert [future.result() for future in futures] == [1] * 10
+
+        write_queue = file_db.get_write_queue()
+        write_queue.flush()
+        assert file_db.execute(COUNT_ROWS).fetchone() == (10,)
+        assert write_queue.metrics["writes"] == 10
+        assert write_queue.metrics["batches"] <= 10
+        write_queue.close()
+
+    def test_write_queue_rolls_back_only_the_failing_write(self, file_db):
+        failing = file_db.write_many(INSERT_DATA, [DATA[0], DATA[0]])
+        passing = file_db.write(INSERT_DATA, *DATA[1])
+        with pytest.raises(sqlite3.IntegrityError):
+            failing.result()
+        assert passing.result() == 1
+        assert file_db.execute("SELECT id FROM spoon_product").fetchall() == [(2,)]
+        file_db.get_write_queue().close()
+
+    def test_write_queue_rolls_back_a_batch_failing_to_commit(self, file_db, monkeypatch):
+        write_queue = file_db.get_write_queue()
+        write_queue.flush()
+        commit = write_queue.db.commit
+
+        def failing_commit():
+            monkeypatch.setattr(write_queue.db, "commit", commit)
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(write_queue.db, "commit", failing_commit)
+        with pytest.raises(sqlite3.OperationalError):
+            file_db.write(INSERT_DATA, *DATA[0]).result()
+        assert file_db.write(INSERT_DATA, *DATA[1]).result() == 1
+        assert file_db.execute("SELECT id FROM spoon_product").fetchall() == [(2,)]
+        write_queue.close()
+
+    def test_can_not_queue_writes_to_a_private_memory_database(self, empty_db):
+        with pytest.raises(ValueError):
+            empty_db.write(INSERT_DATA, *DATA[0])
+
+    def test_write_queue_commits_queued_writes_on_exit(self, file_db):
+        script = (
+            "from core.db import SQLiteDB\n"
+            "from tests.conftest import DATA, INSERT_DATA\n"
+            f"db = SQLiteDB({file_db.args[0]!r})\n"
+            "db.write_many(INSERT_DATA, DATA)\n"
+        )
+        subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).parents[1], check=True)
+        assert file_db.execute(COUNT_ROWS).fetchone() == (10,)
@@ -1,8 +1,13 @@
-from sqlite3 import ProgrammingError
+import time
+from sqlite3 import OperationalError, ProgrammingError
 
 import pytest
 
-from tests.conftest import CREATE_MODEL, SELECT_ALL, INSERT_DATA, DATA
+from core.db import QueryTimeoutError
+from tests.conftest import CREATE_MODEL, SELECT_ALL, INSERT_DATA, DATA, MODEL_NAME
+
+RUNAWAY_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+STREAMING_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c"
 
 
 class SQLiteDBTests:
@@ -33,3 +38,47 @@ class SQLiteDBTests:
 
     def test_can_commit(self):
         ...
+
+    def test_can_interrupt_query_over_its_timeout(self, empty_db):
+        db = empty_db
+        with pytest.raises(QueryTimeoutError):
+            db.execute(RUNAWAY_QUERY, timeout=0.05).fetchall()
+        # the budget does not leak into the next command
+        assert db.execute("SELECT 1").fetchall() == [(1,)]
+
+    def test_can_interrupt_fetching_rows_over_its_timeout(self, empty_db):
+        cursor = empty_db.execute(STREAMING_QUERY, timeout=0.05)
+        with pytest.raises(QueryTimeoutError):
+            cursor.fetchall()
+
+    def test_can_interrupt_query_over_its_deadline(self, empty_db):
+        db = empty_db
+        with pytest.raises(QueryTimeoutError):
+            with db.budget(deadline=time.monotonic() + 0.05):
+                db.execute(RUNAWAY_QUERY).fetchall()
+
+    def test_can_backup_incrementally(self, db, tmp_path):
+        steps = []
+        backup_db = db.backup(
+            str(tmp_path / "backup.db"),
+            pages_per_step=1,
+            sleep=0,
+            progress=lambda status, remaining, total: steps.append(remaining),
+        )
+        assert backup_db.execute(SELECT_ALL).fetchall() == DATA
+        assert len(steps) > 1
+        assert steps[-1] == 0
+        backup_db.close()
+
+    @pytest.mark.parametrize("target", [":memory:", "snapshot.db"])
+    def test_can_snapshot_read_only_copy(self, db, tmp_path, target):
+        target = target if target == ":memory:" else str(tmp_path / target)
+        snapshot_db = db.snapshot(target)
+
+        db.execute(f"DELETE FROM {MODEL_NAME}")
+        db.commit()
+        assert snapshot_db.manager.all(MODEL_NAME) == DATA
+
+        with pytest.raises(OperationalError):
+            snapshot_db.execute(f"DELETE FROM {MODEL_NAME}")
+        snapshot_db.close()
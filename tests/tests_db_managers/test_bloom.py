@@ -0,0 +1,116 @@
+from datetime import date
+
+import pytest
+
+from core.bloom import BloomFilter
+from tests.conftest import MODEL_NAME, DATA, INSERT_DATA
+
+
+@pytest.fixture
+def bloom_db(db):
+    db.manager.enable_bloom(MODEL_NAME, "id")
+    db.manager.enable_bloom(MODEL_NAME, "date")
+    yield db
+
+
+class BloomFilterTests:
+    def test_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, fp_rate=0.01)
+        for value in range(1000):
+            bloom.add(value)
+        assert all(value in bloom for value in range(1000))
+
+    def test_false_positive_rate_is_close_to_the_configured_one(self):
+        bloom = BloomFilter(1000, fp_rate=0.01)
+        for value in range(1000):
+            bloom.add(value)
+        false_positives = sum(value in bloom for value in range(1000, 11000))
+        assert false_positives / 10000 < 0.03
+        assert bloom.get_fp_rate() == pytest.approx(0.01, abs=0.005)
+
+    def test_memory_budget_caps_the_filter(self):
+        bloom = BloomFilter(100000, fp_rate=0.001, max_bytes=1024)
+        assert len(bloom.bits) == 1024
+
+
+class SQLiteManagerBloomTests:
+    def test_answers_absent_keys_without_querying(self, bloom_db):
+        bloom_db.close()  # any query would now fail
+        assert bloom_db.manager.filter(MODEL_NAME, id=100) == []
+        assert bloom_db.manager.filter(MODEL_NAME, id__in=[100, 200]) == []
+        assert bloom_db.manager.filter(MODEL_NAME, date=date(2020, 1, 1)) == []
+        assert bloom_db.manager.get_bloom_stats(MODEL_NAME)["id"]["pruned"] == 3
+
+    def test_prunes_absent_keys_from_in_lists(self, bloom_db):
+        assert bloom_db.manager.filter(MODEL_NAME, id__in=[1, 100, 7, 200]) == [DATA[0], DATA[6]]
+        stats = bloom_db.manager.get_bloom_stats(MODEL_NAME)["id"]
+        assert stats["checks"] == 4
+        assert stats["pruned"] == 2
+        assert stats["passed"] == 2
+
+    def test_filter_many_skips_specs_with_absent_keys(self, bloom_db):
+        results = bloom_db.manager.filter_many([(MODEL_NAME, {"id": 100}), (MODEL_NAME, {"id": 1})])
+        assert results == [[], [DATA[0]]]
+
+    def test_tracks_inserts_through_the_wrapper(self, bloom_db):
+        new_row = (11, "http://www.spoon.guru/new/", "2021-04-01", 90)
+        bloom_db.execute(INSERT_DATA, *new_row)
+        bloom_db.executemany(INSERT_DATA, [(12, *new_row[1:])])
+        assert bloom_db.manager.filter(MODEL_NAME, id=11) == [new_row]
+        assert bloom_db.manager.filter(MODEL_NAME, id=12) == [(12, *new_row[1:])]
+
+    def test_rebuilds_after_untracked_writes(self, bloom_db):
+        bloom_db.execute(f"UPDATE {MODEL_NAME} SET id = 100 WHERE id = 1")
+        assert bloom_db.manager.filter(MODEL_NAME, id=100) == [(100, *DATA[0][1:])]
+
+        bloom_db.execute(f"INSERT INTO {MODEL_NAME} (url) VALUES (?)", "http://www.spoon.guru/auto-id/")
+        assert len(bloom_db.manager.filter(MODEL_NAME, id=101)) == 1
+
+    def test_tracks_bound_values_next_to_literal_ones(self, bloom_db):
+        bloom_db.execute(f"INSERT INTO {MODEL_NAME} VALUES (11, ?, ?, ?)", "http://www.spoon.guru/new/", "2021-04-01", 90)
+        assert len(bloom_db.manager.filter(MODEL_NAME, id=11)) == 1
+        assert len(bloom_db.manager.filter(MODEL_NAME, date="2021-04-01")) == 1
+
+    def test_tracks_multi_row_inserts(self, bloom_db):
+        bloom_db.execute(
+            f"INSERT INTO {MODEL_NAME} VALUES (?, ?, ?, ?), (?, ?, ?, ?)",
+            11, "http://www.spoon.guru/a/", "2021-04-01", 90, 12, "http://www.spoon.guru/b/", "2021-04-02", 90,
+        )
+        assert len(bloom_db.manager.filter(MODEL_NAME, id=12)) == 1
+        assert len(bloom_db.manager.filter(MODEL_NAME, date="2021-04-02")) == 1
+
+    def test_tracks_literal_only_inserts(self, bloom_db):
+        bloom_db.execute(f"INSERT INTO {MODEL_NAME} VALUES (11, 'http://www.spoon.guru/new/', '2021-04-01', 90)")
+        assert len(bloom_db.manager.filter(MODEL_NAME, id=11)) == 1
+
+    def test_keys_values_the_way_column_affinity_stores_them(self, bloom_db):
+        bloom_db.execute(INSERT_DATA, "011", "http://www.spoon.guru/new/", "2021-04-01", 90)
+        assert len(bloom_db.manager.filter(MODEL_NAME, id=11)) == 1
+        assert len(bloom_db.manager.filter(MODEL_NAME, id="11.0")) == 1
+        assert bloom_db.manager.get_bloom_stats(MODEL_NAME)["id"]["pruned"] == 0
+
+    def test_keys_numeric_looking_text(self):
+        bloom = BloomFilter(100, numeric=True)
+        bloom.add("07")
+        assert 7 in bloom and 7.0 in bloom and " 7 " in bloom
+        assert bloom.get_key("7a") == "7a"
+        assert BloomFilter(100).get_key("07") == "07"
+
+    @pytest.mark.parametrize(
+        "sql",
+        [f"INSERT INTO main.{MODEL_NAME} VALUES (?, ?, ?, ?)",
+         f"/* comment */ INSERT INTO {MODEL_NAME} VALUES (?, ?, ?, ?)",
+         f"-- comment\nINSERT INTO {MODEL_NAME} VALUES (?, ?, ?, ?)",
+         f"WITH x AS (SELECT 1) INSERT INTO {MODEL_NAME} VALUES (?, ?, ?, ?)",
+         f"INSERT INTO {MODEL_NAME.upper()} VALUES (?, ?, ?, ?)"],
+    )
+    def test_follows_or_rebuilds_after_any_write_naming_the_model(self, bloom_db, sql):
+        bloom_db.execute(sql, 50, "http://www.spoon.guru/new/", "2021-04-01", 90)
+        assert len(bloom_db.manager.filter(MODEL_NAME, id=50)) == 1
+
+    def test_keys_values_the_way_sqlite_binds_them(self, bloom_db):
+        bloom_db.manager.enable_bloom(MODEL_NAME, "rating")
+        bloom_db.execute(INSERT_DATA, 11, "http://www.spoon.guru/new/", date(2021, 4, 1), True)
+        assert len(bloom_db.manager.filter(MODEL_NAME, rating=1)) == 1
+        assert len(bloom_db.manager.filter(MODEL_NAME, date=date(2021, 4, 1))) == 1
+        assert len(bloom_db.manager.filter(MODEL_NAME, date="2021-04-01")) == 1
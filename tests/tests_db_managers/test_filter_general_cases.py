@@ -18,3 +18,14 @@ class FilterGeneralTests:
         url = "it does not matters"  # a string field does not support gt, lt, gte, lte
         with pytest.raises(FilterLookupError):
             db.manager.filter(MODEL_NAME, url__gt=url)
+
+    def test_can_not_filter_with_only_query_options(self, db):
+        with pytest.raises(FilterLookupError):
+            db.manager.filter(MODEL_NAME, timeout=5)
+
+    def test_can_filter_fields_named_like_query_options(self, db):
+        db.execute("CREATE TABLE event (id integer PRIMARY KEY, timeout integer, sample text)")
+        db.execute("INSERT INTO event VALUES (1, 5, 'a'), (2, 10, 'b')")
+        assert db.manager.filter("event", {"timeout": 5}) == [(1, 5, "a")]
+        assert db.manager.filter("event", {"timeout__gt": 1, "sample": "b"}, timeout=5) == [(2, 10, "b")]
+        assert db.manager.approx_count("event", {"sample": "a"}) == (1, 0)
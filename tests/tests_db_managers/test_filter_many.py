@@ -0,0 +1,36 @@
+from datetime import date
+
+import pytest
+
+from core.formats import FilterLookupError
+from tests.conftest import MODEL_NAME, DATA
+
+
+class FilterManyTests:
+    def test_can_filter_many_specs_in_order(self, db):
+        specs = [
+            (MODEL_NAME, {"id": 7}),
+            (MODEL_NAME, {"url": "http://www.spoon.guru/bbq-recipes/"}),
+            (MODEL_NAME, {"date__gte": date(2021, 2, 15), "rating__lt": 10}),
+            (MODEL_NAME, {"id__in": [100, 200]}),
+        ]
+        results = db.manager.filter_many(specs)
+
+        assert len(results) == len(specs)
+        for (model, kwargs), spec_results in zip(specs, results):
+            assert sorted(spec_results) == sorted(db.manager.filter(model, **kwargs))
+        assert results[0] == [DATA[6]]
+        assert results[3] == []
+
+    def test_can_filter_many_specs_above_compound_select_limit(self, db):
+        db.manager.MAX_COMPOUND_SELECT = 3
+        specs = [(MODEL_NAME, {"id": pk}) for pk in range(1, 11)]
+        results = db.manager.filter_many(specs)
+        assert results == [[row] for row in DATA]
+
+    def test_can_filter_many_with_no_specs(self, db):
+        assert db.manager.filter_many([]) == []
+
+    def test_can_not_filter_many_spec_without_conditions(self, db):
+        with pytest.raises(FilterLookupError):
+            db.manager.filter_many([(MODEL_NAME, {"id": 1}), (MODEL_NAME, {})])
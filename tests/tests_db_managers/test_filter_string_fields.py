@@ -1,6 +1,7 @@
 import pytest
 
-from tests.conftest import MODEL_NAME
+from core.formats import Format, FilterLookupError, get_prefix_successor
+from tests.conftest import MODEL_NAME, get_query_plan
 
 
 class FilterStringFieldTests:
@@ -36,3 +37,56 @@ class FilterStringFieldTests:
     def test_can_filter_fields_with_in_and_not_in_conditions(self, filter, lookup, lookup_list, queryset_results_len):
         queryset_results = filter(MODEL_NAME, **{lookup: lookup_list})
         assert len(queryset_results) == queryset_results_len
+
+    @pytest.mark.parametrize(
+        "filter, lookup, value, expected_ids",
+        [["filter", "url__startswith", "http://www.spoon.guru/b", [4, 9, 10]],
+         ["filter", "url__startswith", "http://www.spoon.guru/the-", [6, 7]],
+         ["filter", "url__startswith", "http://", list(range(1, 11))],
+         ["filter", "url__startswith", "https://", []],
+         ["filter", "url__range", ("http://www.spoon.guru/b", "http://www.spoon.guru/c"), [4, 9, 10]],
+         ["filter", "url__range", ["http://www.spoon.guru/blog/", "http://www.spoon.guru/contact-2/"], [4]]],
+        indirect=["filter"],
+    )
+    def test_can_filter_fields_with_prefix_and_range_conditions(self, filter, lookup, value, expected_ids):
+        """
+        GIVEN a model name with a startswith or a half-open [low, high) range lookup
+        WHEN the db.manager.filter('table_name', field__lookup=value)
+             method is call to query and filter down the entries in the db table
+        THEN we check that the ids of the results are the expected ones.
+        """
+        queryset_results = filter(MODEL_NAME, **{lookup: value})
+        assert sorted(qs_r[0] for qs_r in queryset_results) == expected_ids
+
+    def test_prefix_condition_is_an_index_range_scan(self, db):
+        db.execute(f"CREATE INDEX {MODEL_NAME}_url_idx ON {MODEL_NAME} (url)")
+        assert "SEARCH spoon_product USING INDEX spoon_product_url_idx (url>? AND url<?)" in get_query_plan(
+            db, url__startswith="http://www.spoon.guru/blog/"
+        )
+
+    def test_prefix_condition_binds_its_values(self, db):
+        prefix = "http://www.spoon.guru/'; DROP TABLE spoon_product; --"
+        assert db.manager.filter(MODEL_NAME, url__startswith=prefix) == []
+        assert len(db.manager.all(MODEL_NAME)) == 10
+
+    def test_prefix_condition_params_are_built_once(self):
+        field_class = Format("url__startswith", "http://").get_format_class()
+        assert field_class.get_string() == field_class.get_string() == "url>=? AND url<?"
+        assert field_class.params == ["http://", "http:/0"]
+
+    @pytest.mark.parametrize(
+        "lookup, value",
+        [["url__startswith", ["http://"]], ["url__range", ["http://"]], ["url__range", ["a", "b", "c"]]],
+    )
+    def test_can_not_filter_with_wrong_prefix_or_range_values(self, db, memory_db, lookup, value):
+        with pytest.raises(FilterLookupError):
+            db.manager.filter(MODEL_NAME, **{lookup: value})
+        with pytest.raises(FilterLookupError):
+            memory_db.manager.filter(MODEL_NAME, **{lookup: value})
+
+    @pytest.mark.parametrize(
+        "prefix, successor",
+        [["abc", "abd"], ["a" + chr(0x10FFFF), "b"], [chr(0x10FFFF), None], ["", None], [chr(0xD7FF), chr(0xE000)]],
+    )
+    def test_prefix_successor(self, prefix, successor):
+        assert get_prefix_successor(prefix) == successor
@@ -0,0 +1,102 @@
+import pytest
+
+from core.db import SQLiteDB
+from core.formats import TRANSFORMS, FilterLookupError
+from core.memory import InMemoryDB
+from tests.conftest import CREATE_MODEL, MODEL_NAME, DATA, INSERT_DATA, get_query_plan
+
+# values sqlite date, length and lower functions read in different ways
+SQLITE_VALUES = [
+    "2021-01-01", "2021-01-01T10:00", "2021-01-01 10:00:00.5 +01:00", "2021-01-01 23:00-05:00",
+    "2021-01-01 24:00", "2021-01-01T", "10:00", "10:00+03:00", "2459000.7", 2459000, 2459000.7,
+    "2021-13-01", "2021-01-32", "2021-1-01", " 2021-01-01", "2021-01-01Z", "2021-01-01 10", "20210101",
+    -1, 1e20, 1.5, 123, "ÄBc", b"AB",
+]
+
+
+class FilterTransformTests:
+    @pytest.mark.parametrize(
+        "filter, lookup, value, expected_ids",
+        [["filter", "date__year", 2021, list(range(1, 11))],
+         ["filter", "date__month", 2, [7, 8, 9]],
+         ["filter", "date__month__gte", 2, [7, 8, 9, 10]],
+         ["filter", "date__day__in", [2, 16], [2, 7, 9, 10]],
+         ["filter", "date__weekday", 0, [4, 8]],  # mondays
+         ["filter", "url__length__lt", 30, [1, 4]],
+         ["filter", "url__lower", "http://www.spoon.guru/blog/", [4]],
+         ["filter", "url__lower__length", 27, [4]]],
+        indirect=["filter"],
+    )
+    def test_can_filter_transformed_fields(self, filter, lookup, value, expected_ids):
+        queryset_results = filter(MODEL_NAME, **{lookup: value})
+        assert [qs_r[0] for qs_r in queryset_results] == expected_ids
+
+    @pytest.mark.parametrize(
+        "lookup, value",
+        [["date__month", 2], ["date__weekday__in", [0, 6]], ["url__length__gt", 30], ["url__lower", "x"]],
+    )
+    def test_in_memory_transforms_match_sqlite_backend(self, db, lookup, value):
+        memory_db = InMemoryDB(db, [MODEL_NAME])
+        memory_db.connect()
+        assert memory_db.manager.filter(MODEL_NAME, **{lookup: value}) == db.manager.filter(MODEL_NAME, **{lookup: value})
+
+    def test_can_not_filter_unknown_transform(self, db):
+        with pytest.raises(FilterLookupError):
+            db.manager.filter(MODEL_NAME, date__century=21)
+
+    def test_can_not_filter_transform_with_wrong_value_type(self, db):
+        with pytest.raises(FilterLookupError):
+            db.manager.filter(MODEL_NAME, date__year="2021")
+
+    def test_expression_index_is_used(self, db):
+        assert "SCAN" in get_query_plan(db, date__month=2)
+        db.manager.create_transform_index(MODEL_NAME, "date__month")
+        assert "USING INDEX spoon_product_date_month_idx" in get_query_plan(db, date__month=2)
+        assert len(db.manager.filter(MODEL_NAME, date__month=2)) == 3
+
+    def test_generated_column_index_is_used(self, db):
+        db.manager.create_transform_index(MODEL_NAME, "date__year", generated=True)
+        assert "INDEX spoon_product_date_year_idx" in get_query_plan(db, date__year__gte=2021)
+        assert db.manager.filter(MODEL_NAME, date__year=2021, id=1) == [DATA[0]]
+        assert db.manager.all(MODEL_NAME) == DATA
+        assert db.manager.filter_many([(MODEL_NAME, {"id": 1})]) == [[DATA[0]]]
+
+    def test_can_not_generate_a_column_over_a_user_column(self, empty_db):
+        empty_db.execute("CREATE TABLE event (id integer PRIMARY KEY, date text, date_year integer)")
+        empty_db.execute("INSERT INTO event VALUES (1, '2021-01-01', 1999)")
+        with pytest.raises(ValueError):
+            empty_db.manager.create_transform_index("event", "date__year", generated=True)
+        assert empty_db.manager.filter("event", date__year=2021) == [(1, "2021-01-01", 1999)]
+
+    def test_can_index_an_existing_generated_column_again(self, db):
+        db.manager.create_transform_index(MODEL_NAME, "date__year", generated=True)
+        db.manager.generated_fields.clear()
+        db.manager.create_transform_index(MODEL_NAME, "date__year", generated=True)
+        assert db.manager.get_generated_fields(MODEL_NAME) == {"date__year": "date_year"}
+
+    def test_generated_columns_are_found_by_other_connections(self, tmp_path):
+        db = SQLiteDB(str(tmp_path / "db.sqlite"))
+        db.connect()
+        db.execute(CREATE_MODEL)
+        db.executemany(INSERT_DATA, DATA)
+        db.manager.create_transform_index(MODEL_NAME, "date__year", generated=True)
+        db.commit()
+        db.close()
+
+        db = SQLiteDB(str(tmp_path / "db.sqlite"))
+        db.connect()
+        assert db.manager.get_generated_fields(MODEL_NAME) == {"date__year": "date_year"}
+        assert "INDEX spoon_product_date_year_idx" in get_query_plan(db, date__year__gte=2021)
+        assert db.manager.filter(MODEL_NAME, date__year=2021, id=1) == [DATA[0]]
+        db.close()
+
+    @pytest.mark.parametrize("transform", TRANSFORMS)
+    def test_in_memory_transforms_are_computed_by_sqlite(self, empty_db, transform):
+        empty_db.execute("CREATE TABLE event (id integer PRIMARY KEY, value)")
+        empty_db.executemany("INSERT INTO event (value) VALUES (?)", [(value,) for value in SQLITE_VALUES])
+        memory_db = InMemoryDB(empty_db, ["event"])
+        memory_db.connect()
+        sql = TRANSFORMS[transform][0].format(field="value")
+        for value, in empty_db.execute(f"SELECT DISTINCT {sql} FROM event WHERE {sql} IS NOT NULL"):
+            lookup = {f"value__{transform}": value}
+            assert memory_db.manager.filter("event", **lookup) == empty_db.manager.filter("event", **lookup)
@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from core.formats import FilterLookupError
+from tests.conftest import MODEL_NAME, DATA, INSERT_DATA
+
+URLS = ["http://www.spoon.guru/bbq-recipes/", "http://www.spoon.guru/contact-2/"]
+DATES = [date(2021, 1, 5), date(2021, 1, 2)]
+
+FILTERS = [
+    {"url": "http://www.spoon.guru/bbq-recipes/"},
+    {"url": "http://www.spoon.guru/solutions/"},
+    {"url__in": URLS},
+    {"url__not_in": URLS},
+    {"url__startswith": "http://www.spoon.guru/b"},
+    {"url__range": ("http://www.spoon.guru/b", "http://www.spoon.guru/c")},
+    {"date": date(2021, 1, 5)},
+    {"date__gt": date(2021, 1, 5)},
+    {"date__gte": date(2021, 1, 5)},
+    {"date__lt": date(2021, 1, 2)},
+    {"date__lte": date(2021, 1, 2)},
+    {"date__in": DATES},
+    {"date__not_in": DATES},
+    {"date__gt": date(2021, 2, 2), "date__lt": date(2021, 3, 16)},
+    {"id": 6},
+    {"id__gt": 6},
+    {"id__gte": 6},
+    {"id__lt": 6},
+    {"id__lte": 6},
+    {"id__in": [1, 4, 9]},
+    {"id__not_in": [1, 4, 9]},
+    {"rating": 5},
+    {"rating__gt": 4, "rating__lt": 78},
+    {"date__gt": date(2021, 1, 2), "id__in": [1, 2, 6, 7], "rating__gt": 4, "rating__lt": 78},
+    {"id__in": [100]},
+    {"id": "5"},
+    {"id__in": ["1", "07"]},
+    {"rating__range": ["5", "50"]},
+]
+
+
+class InMemoryManagerTests:
+    def test_can_retrieve_all_objects(self, memory_db):
+        assert memory_db.manager.all(MODEL_NAME) == DATA
+
+    @pytest.mark.parametrize("kwargs", FILTERS)
+    def test_filter_matches_sqlite_backend(self, db, memory_db, kwargs):
+        assert memory_db.manager.filter(MODEL_NAME, **kwargs) == db.manager.filter(MODEL_NAME, **kwargs)
+
+    def test_can_not_filter_field_if_lookup_not_allowed(self, memory_db):
+        with pytest.raises(FilterLookupError):
+            memory_db.manager.filter(MODEL_NAME, url__gt="it does not matters")
+
+    def test_can_refresh_on_change_signal(self, db, memory_db):
+        db.execute(INSERT_DATA, 11, "http://www.spoon.guru/new/", "2021-04-01", 90)
+        db.commit()
+        assert memory_db.manager.filter(MODEL_NAME, id=11) == []
+
+        memory_db.refresh()
+        assert memory_db.manager.filter(MODEL_NAME, id=11) == [(11, "http://www.spoon.guru/new/", "2021-04-01", 90)]
+
+    def test_can_refresh_on_schedule(self, db, memory_db):
+        memory_db.refresh_interval = 0
+        db.execute(INSERT_DATA, 11, "http://www.spoon.guru/new/", "2021-04-01", 90)
+        db.commit()
+        assert len(memory_db.manager.all(MODEL_NAME)) == 11
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from tests.conftest import CREATE_MODEL, MODEL_NAME, DATA, INSERT_DATA
+
+ROWS = 10000
+
+
+@pytest.fixture
+def big_db(empty_db):
+    db = empty_db
+    rand = random.Random(0)
+    db.execute(CREATE_MODEL)
+    db.executemany(INSERT_DATA, ((pk, f"http://www.spoon.guru/{pk}/", "2021-01-01", rand.randrange(100)) for pk in range(ROWS)))
+    db.commit()
+    yield db
+
+
+class SQLiteManagerSampleTests:
+    def test_can_sample_a_fraction_of_all_objects(self, big_db):
+        results = big_db.manager.all(MODEL_NAME, sample=0.1)
+        assert len(results) == pytest.approx(ROWS * 0.1, rel=0.05)
+        assert results == big_db.manager.all(MODEL_NAME, sample=0.1)
+        assert results != big_db.manager.all(MODEL_NAME, sample=0.1, seed=1)
+
+    def test_can_filter_a_fraction_of_the_objects(self, big_db):
+        results = big_db.manager.filter(MODEL_NAME, sample=0.2, rating__lt=10)
+        assert len(results) == pytest.approx(ROWS * 0.2 * 0.1, rel=0.2)
+        assert all(row[3] < 10 for row in results)
+
+    def test_can_filter_a_reservoir_sample(self, big_db):
+        results = big_db.manager.filter(MODEL_NAME, sample=50, rating__lt=10)
+        assert len(results) == 50
+        assert all(row[3] < 10 for row in results)
+        assert results == big_db.manager.filter(MODEL_NAME, sample=50, rating__lt=10)
+
+    def test_reservoir_sample_larger_than_the_results_returns_them_all(self, db):
+        assert sorted(db.manager.all(MODEL_NAME, sample=100)) == DATA
+
+    def test_can_approx_count_within_error_bounds(self, big_db):
+        exact = len(big_db.manager.filter(MODEL_NAME, rating__lt=25))
+        estimate, error = big_db.manager.approx_count(MODEL_NAME, sample_size=2000, rating__lt=25)
+        assert 0 < error < exact * 0.2
+        assert abs(estimate - exact) <= error
+
+    def test_approx_count_error_bound_holds_on_clustered_entries(self, empty_db):
+        empty_db.execute(CREATE_MODEL)
+        empty_db.executemany(INSERT_DATA, ((pk, "", "2021-01-01", (pk // 100) % 2) for pk in range(ROWS)))
+        exact = ROWS // 2
+        covered = 0
+        for seed in range(100):
+            estimate, error = empty_db.manager.approx_count(MODEL_NAME, sample_size=500, seed=seed, rating=1)
+            covered += abs(estimate - exact) <= error
+        assert covered >= 90
+
+    def test_approx_count_is_exact_when_the_sample_covers_the_model(self, db):
+        assert db.manager.approx_count(MODEL_NAME, rating__gt=10) == (5, 0)
+        assert db.manager.approx_count(MODEL_NAME) == (10, 0)
+
+    @pytest.mark.parametrize("sample", [0.0, -0.5, 1.5, True, -1, "0.1"])
+    def test_can_not_sample_invalid_values(self, db, sample):
+        with pytest.raises(ValueError):
+            db.manager.all(MODEL_NAME, sample=sample)
+        with pytest.raises(ValueError):
+            db.manager.filter(MODEL_NAME, sample=sample, rating__gt=10)
+
+    def test_can_not_approx_count_without_rowids(self, db):
+        db.execute(f"CREATE VIEW {MODEL_NAME}_view AS SELECT * FROM {MODEL_NAME}")
+        with pytest.raises(ValueError):
+            db.manager.approx_count(f"{MODEL_NAME}_view", sample_size=2)
+        with pytest.raises(ValueError):
+            db.manager.approx_count(MODEL_NAME, sample_size=0)
+
+    def test_approx_count_of_empty_model_is_zero(self, empty_db):
+        empty_db.execute(CREATE_MODEL)
+        assert empty_db.manager.approx_count(MODEL_NAME) == (0, 0)
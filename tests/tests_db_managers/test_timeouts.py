@@ -0,0 +1,32 @@
+import pytest
+
+from core.db import QueryTimeoutError
+from tests.conftest import MODEL_NAME, DATA
+
+RUNAWAY_MODEL = "runaway"
+CREATE_RUNAWAY_MODEL = f"""
+                CREATE VIEW {RUNAWAY_MODEL} AS
+                WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c)
+                SELECT x AS id FROM c"""
+
+
+@pytest.fixture
+def runaway_db(db):
+    db.execute(CREATE_RUNAWAY_MODEL)
+    yield db
+
+
+class SQLiteManagerTimeoutTests:
+    def test_can_cut_off_filter_over_its_timeout(self, runaway_db):
+        with pytest.raises(QueryTimeoutError):
+            runaway_db.manager.filter(RUNAWAY_MODEL, timeout=0.05, id=-1)
+
+    def test_can_cut_off_all_with_model_default_timeout(self, runaway_db):
+        runaway_db.manager.set_timeout(RUNAWAY_MODEL, 0.05)
+        with pytest.raises(QueryTimeoutError):
+            runaway_db.manager.all(RUNAWAY_MODEL)
+
+    def test_queries_within_budget_are_not_interrupted(self, runaway_db):
+        runaway_db.manager.set_timeout(MODEL_NAME, 5)
+        assert runaway_db.manager.all(MODEL_NAME) == DATA
+        assert runaway_db.manager.filter(MODEL_NAME, timeout=5, id=1) == [DATA[0]]